@@ -1,7 +1,51 @@
 import itertools
+import weakref
 
 
 class Sentence():
+    """
+    Logical sentence. Sentences are immutable and hash-consed: building
+    a sentence equal to one that already exists returns that same
+    object, so equality is identity and subsentences are shared.
+    Each sentence computes its hash and its symbols once.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Every live sentence by its class and parts
+    _interned = weakref.WeakValueDictionary()
+
+    # Attributes holding the parts of the sentence, in constructor order
+    _fields = ()
+
+    def __new__(cls):
+        return cls._intern((), frozenset())
+
+    @classmethod
+    def _intern(cls, parts, symbols):
+        """Returns the sentence of this class with these parts."""
+        key = (cls,) + parts
+        sentence = Sentence._interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for field, part in zip(cls._fields, parts):
+                object.__setattr__(sentence, field, part)
+            object.__setattr__(sentence, "_hash", hash(key))
+            object.__setattr__(sentence, "_symbols", symbols)
+            Sentence._interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, f) for f in self._fields))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +56,8 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +87,11 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+    _fields = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls._intern((name,), frozenset([name]))
 
     def __repr__(self):
         return self.name
@@ -65,20 +105,14 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    __slots__ = ("operand",)
+    _fields = ("operand",)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls._intern((operand,), operand.symbols())
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,24 +123,22 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+    _fields = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+        return cls._intern(
+            (conjuncts,),
+            frozenset().union(*[conjunct.symbols() for conjunct in conjuncts])
         )
 
+    def __reduce__(self):
+        return (And, self.conjuncts)
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -114,8 +146,10 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "sentences are immutable, build a new one instead: "
+            "And(*knowledge.conjuncts, conjunct)"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,24 +160,22 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+    _fields = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+        return cls._intern(
+            (disjuncts,),
+            frozenset().union(*[disjunct.symbols() for disjunct in disjuncts])
         )
 
+    def __reduce__(self):
+        return (Or, self.disjuncts)
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -157,24 +189,18 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+    _fields = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls._intern(
+            (antecedent, consequent),
+            antecedent.symbols() | consequent.symbols()
+        )
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +214,15 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+    _fields = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls._intern((left, right), left.symbols() | right.symbols())
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,12 +238,25 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query.
+
+    With method "enumerate", every assignment of the symbols is checked.
+    With method "truthtable", every assignment is checked too, but many
+    at once by the bit-parallel function truthtable.py compiles.
+    With method "sat", the sentences are converted to clauses and given
+    to the SAT solver in sat.py, which scales to hundreds of symbols.
+    """
+    if method == "truthtable":
+        import truthtable
+        return truthtable.entails(knowledge, query)
+    if method == "sat":
+        import sat
+        return sat.entails(knowledge, query)
+    if method != "enumerate":
+        raise ValueError(f"unknown model checking method: {method}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +287,25 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def count_models(sentence, symbols=None):
+    """
+    Counts the assignments of `symbols` (names, by default those of the
+    sentence) that make the sentence true, see sat.py.
+    """
+    import sat
+    return sat.count_models(sentence, symbols)
+
+
+def iter_models(sentence, symbols=None):
+    """
+    Yields the assignments of `symbols` (names, by default those of the
+    sentence) that make the sentence true, as model dictionaries.
+    """
+    import sat
+    return sat.iter_models(sentence, symbols)
@@ -0,0 +1,624 @@
+import heapq
+import itertools
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+
+class CNF():
+    """
+    Converts sentences to clauses in conjunctive normal form with the
+    Tseitin encoding: every compound subsentence gets a new variable
+    that is made equivalent to it, so the clauses grow linearly with
+    the sentence. Variables are positive integers and a literal is a
+    variable or its negation; a clause is a list of literals.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.names = {}
+        self.count = 0
+        self.clauses = []
+
+        # Literal standing for each subsentence encoded so far
+        self.definitions = {}
+
+        # Variable that is always true, created when first needed
+        self.true = None
+
+    def new_variable(self):
+        """Returns a new variable."""
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable of a symbol name."""
+        if name not in self.variables:
+            variable = self.new_variable()
+            self.variables[name] = variable
+            self.names[variable] = name
+        return self.variables[name]
+
+    def constant(self, value):
+        """Returns a literal that is always `value`."""
+        if self.true is None:
+            self.true = self.new_variable()
+            self.clauses.append([self.true])
+        return self.true if value else -self.true
+
+    def add(self, sentence):
+        """Adds clauses that hold exactly when the sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when the sentence is."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            literals = [self.literal(c) for c in sentence.conjuncts]
+            if not literals:
+                literal = self.constant(True)
+            elif len(literals) == 1:
+                literal = literals[0]
+            else:
+                literal = self.new_variable()
+                for conjunct in literals:
+                    self.clauses.append([-literal, conjunct])
+                self.clauses.append([literal] + [-c for c in literals])
+        elif isinstance(sentence, Or):
+            literals = [self.literal(d) for d in sentence.disjuncts]
+            if not literals:
+                literal = self.constant(False)
+            elif len(literals) == 1:
+                literal = literals[0]
+            else:
+                literal = self.new_variable()
+                for disjunct in literals:
+                    self.clauses.append([literal, -disjunct])
+                self.clauses.append([-literal] + literals)
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            literal = self.new_variable()
+            self.clauses.append([-literal, -antecedent, consequent])
+            self.clauses.append([literal, antecedent])
+            self.clauses.append([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.new_variable()
+            self.clauses.append([-literal, -left, right])
+            self.clauses.append([-literal, left, -right])
+            self.clauses.append([literal, left, right])
+            self.clauses.append([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.definitions[sentence] = literal
+        return literal
+
+
+class Solver():
+    """
+    Conflict-driven clause learning SAT solver. Clauses can be added
+    between calls to `solve`, which keeps the clauses it learned, and
+    each call can assume some literals true without adding them.
+    """
+
+    def __init__(self):
+        # Per variable (index 0 unused): value, decision level, clause
+        # that implied it, activity and last value for phase saving
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+
+        # Clauses watching each literal, visited when it becomes false;
+        # the two watched literals of a clause are its first two
+        self.watches = {}
+        self.clauses = []
+        self.learnts = []
+
+        # Assigned literals in order, where each decision level starts,
+        # and how far unit propagation has gone through them
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+
+        # Unassigned variables by activity, with stale entries skipped
+        self.heap = []
+        self.increment = 1.0
+
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+
+    def new_variable(self):
+        """Returns a new variable."""
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        variable = len(self.values) - 1
+        self.watches[variable] = []
+        self.watches[-variable] = []
+        heapq.heappush(self.heap, (0.0, variable))
+        return variable
+
+    def reserve(self, variable):
+        """Creates variables up to the given one."""
+        while len(self.values) <= variable:
+            self.new_variable()
+
+    def value(self, literal):
+        """Returns the value of a literal, None if unassigned."""
+        value = self.values[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self._backtrack(0)
+
+        clause = []
+        for literal in literals:
+            self.reserve(abs(literal))
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._watch(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal
+        in `assumptions` true, False otherwise. When satisfiable,
+        `model` holds the value of every variable (index 0 unused).
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self._backtrack(0)
+        for literal in assumptions:
+            self.reserve(abs(literal))
+
+        restart_limit = 100
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+
+                # Learn a clause that prevents this conflict and jump back
+                # to the level where it implies a new literal
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    self._watch(learnt)
+                    self.learnts.append(learnt)
+                    self._assign(learnt[0], learnt)
+                self.increment /= 0.95
+                continue
+
+            # Restart now and then, keeping what was learned
+            if conflicts >= restart_limit:
+                conflicts = 0
+                restart_limit = int(restart_limit * 1.5)
+                self._backtrack(0)
+                continue
+
+            # Assumptions are the first decisions
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self._backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self._assign(literal, None)
+                continue
+
+            variable = self._pick()
+            if variable is None:
+                self.model = list(self.values)
+                self._backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self._assign(variable if self.phases[variable] else -variable,
+                         None)
+
+    def _watch(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def _assign(self, literal, reason):
+        """Makes a literal true at the current decision level."""
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.trail_lim)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """
+        Assigns every literal implied by a clause with all its other
+        literals false. Returns a clause with all literals false,
+        or None if there is none.
+        """
+        values = self.values
+        watches = self.watches
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = watches[false_literal]
+            kept = []
+            for position, clause in enumerate(watchers):
+                # Keep the literal that became false second
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for i in range(2, len(clause)):
+                    literal = clause[i]
+                    value = values[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1], clause[i] = literal, false_literal
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[abs(first)] is not None:
+                        kept.extend(watchers[position + 1:])
+                        watches[false_literal] = kept
+                        self.head = len(self.trail)
+                        return clause
+                    self._assign(first, clause)
+            watches[false_literal] = kept
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, resolving it with the
+        reasons of its literals back to the first unique implication
+        point, and the decision level to jump back to.
+        """
+        level = len(self.trail_lim)
+        seen = set()
+        learnt = [None]
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self._bump(variable)
+                    if self.levels[variable] == level:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+
+            # Resolve on the latest assigned literal of this level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learnt[0] = -literal
+
+        # Watch the literal of the highest level after the asserting one
+        if len(learnt) == 1:
+            return learnt, 0
+        highest = max(range(1, len(learnt)),
+                      key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def _bump(self, variable):
+        """Raises the activity of a variable found in a conflict."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, len(self.values))
+                         if self.values[v] is None]
+            heapq.heapify(self.heap)
+        elif self.values[variable] is None:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def _pick(self):
+        """Returns the most active unassigned variable, or None."""
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if self.values[variable] is None:
+                return variable
+        return None
+
+    def _backtrack(self, level):
+        """Undoes every assignment above a decision level."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = None
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+
+def count_models(sentence, symbols=None):
+    """
+    Returns the number of models of the sentence: assignments of
+    `symbols` (names, by default those of the sentence) that make it
+    true. Symbols the sentence does not mention double the count.
+
+    Every variable the encoding adds is equivalent to a subsentence, so
+    each model of the sentence extends to exactly one model of its
+    clauses, and counting those counts the models. The clauses are split
+    into groups sharing no variable, counted separately and multiplied,
+    and the count of every group is remembered.
+    """
+    _, extra = _model_symbols(sentence, symbols)
+    cnf = CNF()
+    cnf.add(sentence)
+    clauses = [frozenset(clause) for clause in cnf.clauses]
+    variables = frozenset(range(1, cnf.count + 1))
+    return _count(clauses, variables, {}) << len(extra)
+
+
+def iter_models(sentence, symbols=None):
+    """
+    Yields the models of the sentence one at a time, as dictionaries
+    from the names in `symbols` (by default those of the sentence) to
+    truth values. Each model found by the solver is blocked before it
+    looks for the next one.
+    """
+    names, extra = _model_symbols(sentence, symbols)
+    cnf = CNF()
+    cnf.add(sentence)
+    solver = Solver()
+    solver.reserve(cnf.count)
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return
+
+    variables = [cnf.variable(name) for name in names]
+    while solver.solve():
+        model = {name: solver.model[variable]
+                 for name, variable in zip(names, variables)}
+        for values in itertools.product((False, True), repeat=len(extra)):
+            yield {**model, **dict(zip(extra, values))}
+
+        # Rule out this assignment of the sentence's own symbols
+        if not solver.add_clause([-variable if model[name] else variable
+                                  for name, variable in zip(names,
+                                                            variables)]):
+            return
+
+
+def _model_symbols(sentence, symbols):
+    """
+    Returns the symbols of the sentence and the other symbols to
+    count models over, both sorted.
+    """
+    names = sentence.symbols()
+    if symbols is None:
+        return sorted(names), []
+    symbols = set(symbols)
+    if not names <= symbols:
+        raise ValueError("symbols must include every symbol of the sentence")
+    return sorted(names), sorted(symbols - names)
+
+
+def _count(clauses, variables, cache):
+    """
+    Returns the number of assignments of `variables` satisfying every
+    clause, given as frozensets of literals over those variables.
+    """
+    # Assign the literals of unit clauses
+    clauses = [clause for clause in clauses
+               if not any(-literal in clause for literal in clause)]
+    while True:
+        unit = None
+        for clause in clauses:
+            if not clause:
+                return 0
+            if len(clause) == 1:
+                unit = next(iter(clause))
+                break
+        if unit is None:
+            break
+        clauses = _assign(clauses, unit)
+        variables = variables - {abs(unit)}
+    if not clauses:
+        return 1 << len(variables)
+
+    # Variables in no clause can take either value
+    used = set()
+    for clause in clauses:
+        used.update(abs(literal) for literal in clause)
+    total = 1 << len(variables - used)
+
+    for component in _components(clauses):
+        key = frozenset(component)
+        if key not in cache:
+            component_variables = set()
+            occurrences = {}
+            for clause in component:
+                for literal in clause:
+                    variable = abs(literal)
+                    component_variables.add(variable)
+                    occurrences[variable] = occurrences.get(variable, 0) + 1
+
+            # Branch on the variable in the most clauses
+            variable = max(occurrences, key=occurrences.get)
+            rest = frozenset(component_variables - {variable})
+            cache[key] = (
+                _count(_assign(component, variable), rest, cache)
+                + _count(_assign(component, -variable), rest, cache)
+            )
+        total *= cache[key]
+        if total == 0:
+            return 0
+    return total
+
+
+def _assign(clauses, literal):
+    """
+    Returns the clauses left once a literal is true: those containing it
+    are satisfied and its negation is removed from the others.
+    """
+    return [clause - {-literal} if -literal in clause else clause
+            for clause in clauses if literal not in clause]
+
+
+def _components(clauses):
+    """
+    Returns the clauses grouped so that no two groups share a variable.
+    """
+    # Union-find over variables, joining the variables of every clause
+    parent = {}
+
+    def find(variable):
+        while parent.setdefault(variable, variable) != variable:
+            parent[variable] = parent[parent[variable]]
+            variable = parent[variable]
+        return variable
+
+    for clause in clauses:
+        literals = iter(clause)
+        root = find(abs(next(literals)))
+        for literal in literals:
+            other = find(abs(literal))
+            if other != root:
+                parent[other] = root
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(next(iter(clause)))), []).append(clause)
+    return list(groups.values())
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking that the
+    knowledge base is unsatisfiable together with the query false.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    query = cnf.literal(query)
+    solver = Solver()
+    for clause in cnf.clauses:
+        solver.add_clause(clause)
+    return not solver.solve([-query])
+
+
+class KnowledgeBase():
+    """
+    Knowledge base answering many entailment queries with one solver.
+    Sentences are encoded once as they are told, and every query only
+    adds the clauses defining it and solves with it assumed false, so
+    clauses learned for one query speed up the next.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.cnf = CNF()
+        self.solver = Solver()
+
+        # Clauses of `cnf` already given to the solver
+        self.added = 0
+
+        # Answers to earlier queries, by query
+        self.answers = {}
+
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.cnf.add(sentence)
+        self._add_clauses()
+
+        # More knowledge never takes back an entailment, so only the
+        # queries that were not entailed have to be asked again
+        self.answers = {
+            query: answer for query, answer in self.answers.items() if answer
+        }
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        if query not in self.answers:
+            literal = self.cnf.literal(query)
+            self._add_clauses()
+            self.answers[query] = not self.solver.solve([-literal])
+        return self.answers[query]
+
+    def knowledge(self):
+        """Returns the conjunction of every sentence told."""
+        return And(*self.sentences)
+
+    def _add_clauses(self):
+        """Gives the solver the clauses it does not have yet."""
+        for clause in self.cnf.clauses[self.added:]:
+            self.solver.add_clause(clause)
+        self.added = len(self.cnf.clauses)
@@ -0,0 +1,110 @@
+import itertools
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Symbols whose truth values are packed into the bits of one integer:
+# each evaluation covers 2 ** BLOCK models at once
+BLOCK = 16
+
+
+class Compiler():
+    """
+    Compiles a sentence into a Python function over bit-vectors.
+    Bit i of the vector passed for a symbol is its value in model i,
+    and bit i of the result is the value of the sentence in model i,
+    so one call evaluates as many models as the vectors have bits.
+    Shared subsentences are computed once.
+    """
+
+    def __init__(self):
+        self.symbols = []
+        self.arguments = {}
+        self.lines = []
+        self.temporaries = {}
+
+    def compile(self, sentence):
+        """
+        Returns a function taking a mask with a bit set for every model
+        and one vector per symbol of `symbols`, in order, and returning
+        the vector of the sentence.
+        """
+        result = self.expression(sentence)
+        arguments = ", ".join(["mask"] + [
+            self.arguments[name] for name in self.symbols
+        ])
+        source = "\n".join(
+            [f"def sentence({arguments}):"]
+            + [f"    {line}" for line in self.lines]
+            + [f"    return {result}"]
+        )
+        namespace = {}
+        exec(compile(source, "<sentence>", "exec"), namespace)
+        return namespace["sentence"]
+
+    def expression(self, sentence):
+        """Returns the name holding the vector of a sentence."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.arguments:
+                self.arguments[sentence.name] = f"s{len(self.symbols)}"
+                self.symbols.append(sentence.name)
+            return self.arguments[sentence.name]
+        if sentence in self.temporaries:
+            return self.temporaries[sentence]
+
+        if isinstance(sentence, Not):
+            code = f"mask ^ {self.expression(sentence.operand)}"
+        elif isinstance(sentence, And):
+            operands = [self.expression(c) for c in sentence.conjuncts]
+            code = " & ".join(operands) if operands else "mask"
+        elif isinstance(sentence, Or):
+            operands = [self.expression(d) for d in sentence.disjuncts]
+            code = " | ".join(operands) if operands else "0"
+        elif isinstance(sentence, Implication):
+            antecedent = self.expression(sentence.antecedent)
+            consequent = self.expression(sentence.consequent)
+            code = f"(mask ^ {antecedent}) | {consequent}"
+        elif isinstance(sentence, Biconditional):
+            left = self.expression(sentence.left)
+            right = self.expression(sentence.right)
+            code = f"mask ^ {left} ^ {right}"
+        else:
+            raise TypeError("must be a logical sentence")
+
+        name = f"t{len(self.lines)}"
+        self.lines.append(f"{name} = {code}")
+        self.temporaries[sentence] = name
+        return name
+
+
+def patterns(count):
+    """
+    Returns the vectors of `count` symbols over all 2 ** count models:
+    symbol i is true in the models whose number has bit i set.
+    """
+    width = 1 << count
+    mask = (1 << width) - 1
+    vectors = []
+    for i in range(count):
+        run = 1 << i
+        period = (1 << (2 * run)) - 1
+        vectors.append(mask // period * (((1 << run) - 1) << run))
+    return vectors
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating the knowledge base
+    and the negated query on 2 ** BLOCK models per call: the first BLOCK
+    symbols vary inside the bit-vectors, the others between calls.
+    """
+    compiler = Compiler()
+    counterexample = compiler.compile(And(knowledge, Not(query)))
+    count = len(compiler.symbols)
+
+    packed = min(count, BLOCK)
+    mask = (1 << (1 << packed)) - 1
+    vectors = patterns(packed)
+    for values in itertools.product((0, mask), repeat=count - packed):
+        if counterexample(mask, *vectors, *values):
+            return False
+    return True
@@ -0,0 +1,110 @@
+import argparse
+import random
+import sys
+from array import array
+
+import degrees
+
+
+def hop_distribution(person):
+    """
+    Returns how many people are 0, 1, 2, ... hops away from a person
+    (given as an interned id), as a list indexed by hop count.
+    """
+    return [len(layer) for layer in degrees.index.layers(person)]
+
+
+def eccentricity(person):
+    """
+    Returns the largest number of hops from a person (given as an
+    interned id) to anyone connected to them, and one person that far.
+    """
+    for hops, layer in enumerate(degrees.index.layers(person)):
+        farthest = layer
+    return hops, next(iter(farthest))
+
+
+def components():
+    """
+    Labels the connected components of the co-star graph.
+    Returns an array with the component of every interned person and a
+    list with the size of every component.
+    """
+    index = degrees.index
+    labels = array("i", [-1]) * len(index)
+    sizes = []
+    for person in range(len(index)):
+        if labels[person] >= 0:
+            continue
+        size = 0
+        for layer in index.layers(person):
+            for member in layer:
+                labels[member] = len(sizes)
+            size += len(layer)
+        sizes.append(size)
+    return labels, sizes
+
+
+def approximate_diameter(start, sweeps=4):
+    """
+    Returns a lower bound on the diameter of the component of `start`
+    (an interned id) and the two people that far apart, by repeatedly
+    searching from the farthest person found by the previous search.
+    On co-star graphs a few sweeps usually reach the exact diameter.
+    """
+    best = (0, start, start)
+    person = start
+    for _ in range(sweeps):
+        hops, farthest = eccentricity(person)
+        if hops <= best[0] and person != start:
+            break
+        best = (hops, person, farthest)
+        person = farthest
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Degrees of separation statistics over a dataset."
+    )
+    parser.add_argument("directory", help="dataset directory")
+    parser.add_argument(
+        "--person", help="print the hop-count distribution from this person"
+    )
+    parser.add_argument(
+        "--sweeps", type=int, default=4,
+        help="searches used to approximate the diameter"
+    )
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory)
+    degrees.ensure_index()
+    index = degrees.index
+
+    if args.person is not None:
+        person_id = degrees.person_id_for_name(args.person)
+        if person_id is None:
+            sys.exit("Person not found.")
+        counts = hop_distribution(index.person_index[person_id])
+        print(f"Hops from {degrees.people[person_id]['name']}:")
+        for hops, count in enumerate(counts):
+            print(f"  {hops}: {count}")
+        print(f"  not connected: {len(index) - sum(counts)}")
+
+    labels, sizes = components()
+    largest = max(range(len(sizes)), key=sizes.__getitem__)
+    print(f"{len(sizes)} connected components, "
+          f"the largest has {sizes[largest]} of {len(index)} people.")
+
+    # Sweep from a random member of the largest component
+    members = [p for p in range(len(index)) if labels[p] == largest]
+    hops, first, second = approximate_diameter(
+        random.choice(members), args.sweeps
+    )
+    print(f"Diameter of the largest component: at least {hops} "
+          f"({degrees.people[index.person_ids[first]]['name']} to "
+          f"{degrees.people[index.person_ids[second]]['name']}).")
+
+
+if __name__ == "__main__":
+    main()
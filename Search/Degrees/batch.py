@@ -0,0 +1,235 @@
+import argparse
+import csv
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+from util import SearchStats
+
+
+# Lowest similarity a fuzzy match needs to be accepted
+FUZZY_CUTOFF = 0.85
+
+
+def resolve(name, fuzzy=False):
+    """
+    Returns the person_id for a name without asking the user,
+    and an error message when the name is unknown or ambiguous.
+    An IMDB id is accepted in place of a name.
+    With `fuzzy`, a name with no exact match resolves to the single
+    closest known name, if it is close enough.
+    """
+    person_ids = degrees.names.get(name.lower(), set())
+    if not person_ids and fuzzy and name not in degrees.index.person_index:
+        matches = degrees.get_name_index().fuzzy(
+            name, limit=2, cutoff=FUZZY_CUTOFF
+        )
+        if len(matches) == 2 and matches[0][1] == matches[1][1]:
+            return None, "ambiguous name, several close matches"
+        if matches:
+            person_ids = degrees.names[matches[0][0]]
+    if len(person_ids) == 1:
+        return next(iter(person_ids)), None
+    if len(person_ids) > 1:
+        return None, f"ambiguous name, matches {len(person_ids)} people"
+    if name in degrees.index.person_index:
+        return name, None
+    return None, "person not found"
+
+
+def group_queries(pairs):
+    """
+    Groups (source, target) name pairs by source.
+    Returns a list of (source, [(position, target), ...]) in the order
+    the sources first appear.
+    """
+    groups = {}
+    for position, (source, target) in enumerate(pairs):
+        groups.setdefault(source, []).append((position, target))
+    return list(groups.items())
+
+
+def answer_group(source, targets, fuzzy=False, with_stats=False):
+    """
+    Answers every query of one source from a single breadth-first
+    search tree. Returns a list of (position, result) pairs.
+    With `with_stats`, every result carries the counters of the search
+    that answered it.
+    """
+    index = degrees.index
+    source_id, source_error = resolve(source, fuzzy)
+
+    # Resolve every target first so the search knows when it can stop
+    resolved = []
+    for position, target in targets:
+        target_id, error = resolve(target, fuzzy)
+        resolved.append((position, target, target_id, source_error or error))
+    wanted = {index.person_index[target_id]
+              for _, _, target_id, error in resolved if error is None}
+
+    tree = None
+    stats = SearchStats() if with_stats else None
+    if wanted:
+        start = time.perf_counter()
+        tree = index.bfs_tree(index.person_index[source_id], wanted, stats)
+        if stats is not None:
+            stats.seconds = time.perf_counter() - start
+
+    results = []
+    for position, target, target_id, error in resolved:
+        result = {"source": source, "target": target}
+        if error is not None:
+            result["error"] = error
+        else:
+            path = index.path_in_tree(tree, index.person_index[target_id])
+            if path is None:
+                result["degrees"] = None
+                result["path"] = None
+            else:
+                result["degrees"] = len(path)
+                result["path"] = [
+                    [index.movie_ids[movie], index.person_ids[person]]
+                    for movie, person in path
+                ]
+            if stats is not None:
+                result["stats"] = stats.as_dict()
+        results.append((position, result))
+    return results
+
+
+def in_order(groups):
+    """
+    Takes an iterable of answered groups, each a list of
+    (position, result) pairs, and yields the results in query order
+    as soon as all earlier queries have been answered.
+    """
+    pending = {}
+    position = 0
+    for results in groups:
+        pending.update(results)
+        while position in pending:
+            yield pending.pop(position)
+            position += 1
+
+
+def answer(pairs, workers=1, directory=None, fuzzy=False, with_stats=False):
+    """
+    Yields a result dictionary for every (source, target) name pair,
+    in input order, running one search per distinct source.
+    With `fuzzy`, misspelled names are matched to the closest known name.
+    With `with_stats`, results carry the counters of their search.
+
+    With more than one worker, sources are searched in parallel by a
+    pool of processes. Forked workers share the loaded graph with this
+    process copy-on-write; where fork is not available, each worker
+    loads `directory` itself, which maps the same snapshot file.
+    """
+    degrees.ensure_index()
+    if fuzzy:
+        degrees.get_name_index()
+    groups = [(source, targets, fuzzy, with_stats)
+              for source, targets in group_queries(pairs)]
+    if workers <= 1 or len(groups) <= 1:
+        yield from in_order(answer_group(*group) for group in groups)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+
+        # Keep the garbage collector from touching, and so copying,
+        # the pages of objects shared with the workers
+        gc.freeze()
+    else:
+        if directory is None:
+            raise ValueError("directory is needed to start workers")
+        context = multiprocessing.get_context("spawn")
+        initializer, initargs = degrees.load_data, (directory,)
+
+    chunksize = max(1, len(groups) // (workers * 8))
+    try:
+        with context.Pool(workers, initializer, initargs) as pool:
+            yield from in_order(
+                pool.imap_unordered(_answer_group, groups, chunksize)
+            )
+    finally:
+        gc.unfreeze()
+
+
+def _answer_group(group):
+    """
+    Pool entry point for `answer_group`.
+    """
+    return answer_group(*group)
+
+
+def read_queries(path, source=None):
+    """
+    Reads (source, target) name pairs from a CSV file, or target names
+    from it when a single `source` is given. A path of "-" reads stdin.
+    """
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        pairs = []
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if source is not None:
+                pairs.append((source, row[0].strip()))
+            elif len(row) >= 2:
+                pairs.append((row[0].strip(), row[1].strip()))
+            else:
+                sys.exit(f"Expected 'source,target' but got: {row}")
+        return pairs
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees of separation queries "
+                    "from a single load, one JSON line per query."
+    )
+    parser.add_argument("directory", help="dataset directory")
+    parser.add_argument(
+        "queries",
+        help="CSV file of 'source,target' names, or of target names "
+             "with --source ('-' reads stdin)"
+    )
+    parser.add_argument("--source", help="name to measure every target from")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of processes to search with (0 uses every CPU)"
+    )
+    parser.add_argument(
+        "--fuzzy", action="store_true",
+        help="match misspelled names to the closest known name"
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="add search counters and wall time to every result"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="stream the CSV files into compact columns instead of dicts"
+    )
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count()
+
+    pairs = read_queries(args.queries, args.source)
+    degrees.load_data(args.directory, compact=args.compact)
+
+    results = answer(
+        pairs, workers, args.directory, args.fuzzy, args.stats
+    )
+    for result in results:
+        sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
 import csv
 import sys
+import time
+from array import array
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from nameindex import NameIndex
+from graph import GraphIndex, MovieTable, NameTable, PeopleTable, name_columns
+from util import Node
+
+# After `load_data`, `names`, `people` and `movies` are read-only mappings
+# over the graph index and string columns (see graph.py), which build each
+# row when it is looked up. Plain dictionaries of the same shape may be
+# assigned instead, see `ensure_index`; assign new ones rather than
+# changing them in place, so that the index is rebuilt from them.
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +23,48 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compiled integer adjacency of the people/movies graph, used by the search
+index = GraphIndex()
+
+# The `people` and `movies` objects the graph index was built from
+indexed = (None, None)
+
+# Prefix and typo-tolerant index over the keys of `names`, built on first use
+name_index = None
 
-def load_data(directory):
+
+def load_data(directory, cache=True, compact=False):
     """
     Load data from CSV files into memory.
+
+    With `cache` set, a binary snapshot of the data is kept next to
+    the CSV files and loaded instead of them until one of them changes.
+
+    With `compact` set, the CSV files are streamed straight into the
+    graph index and string columns instead of being parsed into
+    dictionaries first. Either way, `names`, `people` and `movies` end
+    up as the same read-only views over the index and columns.
     """
+    global names, people, movies, name_index
+
+    name_index = None
+    if cache:
+        tables = snapshot.read(directory, index)
+        if tables is not None:
+            load_tables(tables)
+            return
+
+    if compact:
+        tables = read_columns(directory)
+        load_tables(tables)
+        if cache:
+            save_snapshot(directory, tables)
+        return
+
+    # A previous compact or snapshot load leaves read-only tables behind
+    if not isinstance(people, dict):
+        names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,6 +99,117 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    # Compile the graph index used by the search
+    index.build(people, movies)
+
+    # Serve the data from the index and columns, as a snapshot load does
+    person_ids, movie_ids = index.person_ids, index.movie_ids
+    person_names = [people[i]["name"] for i in person_ids]
+    tables = {
+        "person_names": person_names,
+        "person_births": [people[i]["birth"] for i in person_ids],
+        "movie_titles": [movies[i]["title"] for i in movie_ids],
+        "movie_years": [movies[i]["year"] for i in movie_ids]
+    }
+    tables.update(name_columns(person_names))
+    load_tables(tables)
+    if cache:
+        save_snapshot(directory, tables)
+
+
+def read_columns(directory):
+    """
+    Streams the CSV files row by row into the graph index and returns
+    the string columns and name table that go with it.
+    """
+    index.clear()
+    person_names = []
+    person_births = []
+    movie_titles = []
+    movie_years = []
+
+    # Load people
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_, name, birth = (header.index(c) for c in ("id", "name", "birth"))
+        for row in reader:
+            person = index.intern_person(row[id_])
+            if person == len(person_names):
+                person_names.append(row[name])
+                person_births.append(row[birth])
+            else:
+                person_names[person] = row[name]
+                person_births[person] = row[birth]
+
+    # Load movies
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_, title, year = (header.index(c) for c in ("id", "title", "year"))
+        for row in reader:
+            movie = index.intern_movie(row[id_])
+            if movie == len(movie_titles):
+                movie_titles.append(row[title])
+                movie_years.append(row[year])
+            else:
+                movie_titles[movie] = row[title]
+                movie_years[movie] = row[year]
+
+    # Load stars as two parallel arrays of interned ids
+    edge_people = array("i")
+    edge_movies = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        person_id = header.index("person_id")
+        movie_id = header.index("movie_id")
+        for row in reader:
+            person = index.person_index.get(row[person_id])
+            movie = index.movie_index.get(row[movie_id])
+            if person is not None and movie is not None:
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+    index.compile(edge_people, edge_movies)
+
+    tables = {
+        "person_names": person_names,
+        "person_births": person_births,
+        "movie_titles": movie_titles,
+        "movie_years": movie_years
+    }
+    tables.update(name_columns(person_names))
+    return tables
+
+
+def save_snapshot(directory, tables):
+    """
+    Writes the snapshot of a data directory, if the directory allows it.
+    """
+    try:
+        snapshot.write(directory, index, tables)
+    except (OSError, ValueError):
+        pass
+
+
+def load_tables(tables):
+    """
+    Points `names`, `people` and `movies` at the graph index and the
+    tables read by `read_columns` or stored with a snapshot.
+    """
+    global names, people, movies, indexed
+
+    names = NameTable(
+        index, tables["name_keys"],
+        tables["name_offsets"], tables["name_people"]
+    )
+    people = PeopleTable(
+        index, tables["person_names"], tables["person_births"]
+    )
+    movies = MovieTable(index, tables["movie_titles"], tables["movie_years"])
+    indexed = (people, movies)
+
 
 def main():
     if len(sys.argv) > 2:
@@ -69,7 +228,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -84,64 +243,119 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None,
+                  profiler=None, frontier=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
     If no possible path, returns None.
+
+    With `bidirectional` set, the search grows from both ends
+    and meets in the middle (see `bidirectional_shortest_path`).
+
+    Given an empty `frontier` from util, the search goes node by node through
+    `neighbors_for_person` instead of the graph index (see
+    `frontier_path`).
+
+    Nodes explored, peak frontier size, neighbors generated, duplicate
+    neighbors and wall time are added to `stats`, a `util.SearchStats`.
+    A `cProfile.Profile` passed as `profiler` is enabled for the search.
     """
-    # TODO
+    ensure_index()
+
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        if frontier is not None:
+            return frontier_path(source, target, frontier, stats)
+
+        # Search over interned integer ids, then translate the path back
+        path = index.shortest_path(
+            index.person_index[source],
+            index.person_index[target],
+            bidirectional=bidirectional,
+            stats=stats
+        )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if stats is not None:
+            stats.seconds += time.perf_counter() - start
+
+    if path is None:
+        return None
+    return [(index.movie_ids[movie], index.person_ids[person])
+            for movie, person in path]
 
-    # List of necessary paths to go through to reach the target
-    path = []
 
-    # Keep track of number of states explored
-    num_explored = 0
+def frontier_path(source, target, frontier, stats=None):
+    """
+    Returns the list of (movie_id, person_id) pairs that connect the
+    source to the target, expanding one Node at a time from a util
+    frontier. Every movie costs 1, so a `DequeQueueFrontier` (breadth-
+    first) or a `PriorityFrontier` (uniform-cost, or A* given an
+    admissible heuristic over person ids) finds a shortest path, and a
+    `DequeStackFrontier` (depth-first) finds some path.
+    If no possible path, returns None.
+
+    The frontier must be empty: a search leaves nodes behind in it,
+    so pass a new one to every search.
+    """
+    if not frontier.empty():
+        raise ValueError("frontier must be empty")
 
-    # Initialize an empty set of explored states
     explored = set()
+    generated = duplicates = peak = 0
+    frontier.add(Node(state=source, parent=None, action=None))
+    try:
+        while not frontier.empty():
+            peak = max(peak, len(frontier))
+            node = frontier.remove()
 
-    # Initialize first node as initial state
-    start = Node(state=source, parent=None, action=None)
-
-    # If source and target starred in the same film we have solution
-    for pair in neighbors_for_person(start.state):
-        if pair[1] == target:
-            path.append(pair)
-            return path
-
-    # Initialize frontier to just the starting position
-    frontier = QueueFrontier()
-    frontier.add(start)
-    
-    # Keep looping until solution is found
-    while True:
-
-        # If nothing in the frontier, then no path
-        if frontier.empty():
-            return None
-        
-        # Choose a node from the frontier
-        node = frontier.remove()
-        num_explored += 1
-
-        # If node is the target, then we have a solution
-        if node.state == target:
+            # If node is the target, then we have a solution
+            if node.state == target:
+                path = []
                 while node.parent is not None:
-                    pair = (node.action, node.state)
-                    path.append(pair)
+                    path.append((node.action, node.state))
                     node = node.parent
                 path.reverse()
                 return path
-        
-        # Mark node as explored
-        explored.add(node.state)
 
-        # Add neighbours to frontier if not already in frontier or explored
-        for action, state in neighbors_for_person(node.state):
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                frontier.add(child)
+            # Add neighbours not already in frontier or explored
+            explored.add(node.state)
+            for action, state in neighbors_for_person(node.state):
+                generated += 1
+                if frontier.contains_state(state) or state in explored:
+                    duplicates += 1
+                    continue
+                frontier.add(Node(state=state, parent=node, action=action,
+                                  cost=node.cost + 1))
+        return None
+    finally:
+        if stats is not None:
+            stats.add(len(explored), peak, generated, duplicates)
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both people at once and stopping where the two searches meet.
+    If no possible path, returns None.
+    """
+    return shortest_path(source, target, bidirectional=True)
+
+
+def ensure_index():
+    """
+    Builds the graph index if `people` and `movies` were assigned
+    without going through `load_data`.
+    """
+    global indexed
+    if indexed[0] is not people or indexed[1] is not movies:
+        index.build(people, movies)
+        indexed = (people, movies)
 
 
 def person_id_for_name(name):
@@ -151,6 +365,9 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = similar_names(name)
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -170,6 +387,29 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def get_name_index():
+    """
+    Returns the index over `names`, building it the first time.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex(names)
+    return name_index
+
+
+def similar_names(name, limit=5):
+    """
+    Returns the names of up to `limit` people whose names are
+    closest to the given one, best first.
+    """
+    suggestions = []
+    for key, _ in get_name_index().fuzzy(name, limit=limit):
+        for person_id in sorted(names[key]):
+            if people[person_id]["name"] not in suggestions:
+                suggestions.append(people[person_id]["name"])
+    return suggestions[:limit]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
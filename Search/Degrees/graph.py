@@ -0,0 +1,434 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+class GraphIndex():
+    """
+    Compiled, read-only view of the co-star graph.
+
+    People and movies are interned to consecutive integers and the
+    graph is stored in compressed-sparse-row (CSR) form: the movies of
+    person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are
+    `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+    Every row is sorted.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Empties the index.
+        """
+        # Interned ids: position in the list is the integer id
+        self.person_ids = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_index = {}
+
+        # CSR adjacency arrays
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def intern_person(self, person_id):
+        """
+        Returns the integer id of a person, assigning a new one if needed.
+        """
+        index = self.person_index.get(person_id)
+        if index is None:
+            index = len(self.person_ids)
+            self.person_index[person_id] = index
+            self.person_ids.append(person_id)
+        return index
+
+    def intern_movie(self, movie_id):
+        """
+        Returns the integer id of a movie, assigning a new one if needed.
+        """
+        index = self.movie_index.get(movie_id)
+        if index is None:
+            index = len(self.movie_ids)
+            self.movie_index[movie_id] = index
+            self.movie_ids.append(movie_id)
+        return index
+
+    def build(self, people, movies):
+        """
+        Rebuilds the index from the `people` and `movies` dictionaries
+        filled in by `degrees.load_data`.
+        """
+        self.clear()
+        for person_id in people:
+            self.intern_person(person_id)
+        for movie_id in movies:
+            self.intern_movie(movie_id)
+
+        # Collect every (person, movie) edge once
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, person in people.items():
+            index = self.person_index[person_id]
+            for movie_id in person["movies"]:
+                movie = self.movie_index.get(movie_id)
+                if movie is not None:
+                    edge_people.append(index)
+                    edge_movies.append(movie)
+
+        self.compile(edge_people, edge_movies)
+
+    def compile(self, edge_people, edge_movies):
+        """
+        Builds the CSR arrays from two parallel arrays of interned
+        (person, movie) edges.
+        """
+        self.person_offsets, self.person_movies = _csr(
+            len(self.person_ids), edge_people, edge_movies
+        )
+        self.movie_offsets, self.movie_stars = _csr(
+            len(self.movie_ids), edge_movies, edge_people
+        )
+
+    def movies_of(self, person):
+        """
+        Returns the interned movies a person starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the interned people who starred in a movie.
+        """
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def shortest_path(self, source, target, bidirectional=False, stats=None):
+        """
+        Returns the shortest list of (movie, person) pairs of interned ids
+        that connect the source to the target.
+        If no possible path, returns None.
+        Search counters are added to `stats`, a `util.SearchStats`.
+        """
+        if source == target:
+            return []
+        if bidirectional:
+            return self._bidirectional_path(source, target, stats)
+        parents = self.bfs_tree(source, {target}, stats)
+        return self.path_in_tree(parents, target)
+
+    def bfs_tree(self, source, targets=None, stats=None):
+        """
+        Runs a breadth-first search from the source and returns its tree,
+        a dictionary mapping each reached person to the (movie, person)
+        it was reached from (None for the source).
+        With `targets`, the search stops once all of them are reached.
+        Search counters are added to `stats`, a `util.SearchStats`.
+        """
+        # Maps each reached person to the (movie, person) it was reached from
+        parents = {source: None}
+        remaining = set(targets) - {source} if targets is not None else None
+        if remaining is not None and not remaining:
+            return parents
+
+        # A movie only needs to be expanded once: all its stars are reached
+        expanded = set()
+
+        explored = generated = 0
+        peak = 1
+        layer = [source]
+        try:
+            while layer:
+                next_layer = []
+                for person in layer:
+                    explored += 1
+                    for movie in self.movies_of(person):
+                        if movie in expanded:
+                            continue
+                        expanded.add(movie)
+                        stars = self.stars_of(movie)
+                        generated += len(stars)
+                        for star in stars:
+                            if star in parents:
+                                continue
+                            parents[star] = (movie, person)
+                            next_layer.append(star)
+                            if remaining is not None and star in remaining:
+                                remaining.discard(star)
+                                if not remaining:
+                                    return parents
+                peak = max(peak, len(next_layer))
+                layer = next_layer
+
+            return parents
+        finally:
+            if stats is not None:
+                stats.add(explored, max(peak, len(next_layer)), generated,
+                          generated - (len(parents) - 1))
+
+    def layers(self, source):
+        """
+        Yields the people at distance 0, 1, 2, ... from the source,
+        one whole level (a set of interned ids) at a time.
+        Each level is computed with set operations over whole rows
+        rather than person by person.
+        """
+        reached = {source}
+        expanded = set()
+        layer = {source}
+        while layer:
+            yield layer
+
+            # Movies of the level that were not expanded yet
+            movies = set()
+            for person in layer:
+                movies.update(self.movies_of(person))
+            movies -= expanded
+            expanded |= movies
+
+            # Their stars that were not reached yet form the next level
+            layer = set()
+            for movie in movies:
+                layer.update(self.stars_of(movie))
+            layer -= reached
+            reached |= layer
+
+    def path_in_tree(self, parents, target):
+        """
+        Returns the path from the root of a `bfs_tree` to the target as
+        (movie, person) pairs of interned ids, or None if the tree does
+        not reach the target.
+        """
+        if target not in parents:
+            return None
+        return _trace(parents, target)
+
+    def _bidirectional_path(self, source, target, stats=None):
+        """
+        Breadth-first search from both ends at once, one whole layer at a
+        time, always growing the smaller side.
+        """
+        # Maps each reached person to (movie, parent person, depth)
+        forward = {source: (None, None, 0)}
+        backward = {target: (None, None, 0)}
+        forward_expanded = set()
+        backward_expanded = set()
+        forward_layer = [source]
+        backward_layer = [target]
+
+        explored = generated = 0
+        peak = 2
+        try:
+            while forward_layer and backward_layer:
+                expand_forward = len(forward_layer) <= len(backward_layer)
+                if expand_forward:
+                    layer, tree, other = forward_layer, forward, backward
+                    expanded = forward_expanded
+                else:
+                    layer, tree, other = backward_layer, backward, forward
+                    expanded = backward_expanded
+
+                # Expand the whole layer, remembering the closest meeting
+                next_layer = []
+                best = None
+                for person in layer:
+                    explored += 1
+                    depth = tree[person][2] + 1
+                    for movie in self.movies_of(person):
+                        if movie in expanded:
+                            continue
+                        expanded.add(movie)
+                        stars = self.stars_of(movie)
+                        generated += len(stars)
+                        for star in stars:
+                            if star in tree:
+                                continue
+                            tree[star] = (movie, person, depth)
+                            next_layer.append(star)
+                            if star in other:
+                                remaining = other[star][2]
+                                if best is None or remaining < best[0]:
+                                    best = (remaining, star)
+
+                if expand_forward:
+                    forward_layer = next_layer
+                else:
+                    backward_layer = next_layer
+                peak = max(peak, len(forward_layer) + len(backward_layer))
+
+                # Both searches met, stitch the two halves together
+                if best is not None:
+                    meeting = best[1]
+                    path = _trace(forward, meeting)
+                    person = meeting
+                    while backward[person][1] is not None:
+                        movie, person, _ = backward[person]
+                        path.append((movie, person))
+                    return path
+
+            return None
+        finally:
+            if stats is not None:
+                new = len(forward) + len(backward) - 2
+                stats.add(explored, peak, generated, generated - new)
+
+
+class PeopleTable(Mapping):
+    """
+    Read-only mapping of person_ids to a dictionary of: name, birth,
+    movies (a set of movie_ids), backed by the graph index and two
+    columns of strings. Rows are built when they are looked up.
+    """
+
+    def __init__(self, index, names, births):
+        self.index = index
+        self.names = names
+        self.births = births
+
+    def __getitem__(self, person_id):
+        person = self.index.person_index[person_id]
+        movie_ids = self.index.movie_ids
+        return {
+            "name": self.names[person],
+            "birth": self.births[person],
+            "movies": {movie_ids[movie]
+                       for movie in self.index.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.index.person_ids)
+
+    def __len__(self):
+        return len(self.index.person_ids)
+
+
+class MovieTable(Mapping):
+    """
+    Read-only mapping of movie_ids to a dictionary of: title, year,
+    stars (a set of person_ids), backed by the graph index and two
+    columns of strings. Rows are built when they are looked up.
+    """
+
+    def __init__(self, index, titles, years):
+        self.index = index
+        self.titles = titles
+        self.years = years
+
+    def __getitem__(self, movie_id):
+        movie = self.index.movie_index[movie_id]
+        person_ids = self.index.person_ids
+        return {
+            "title": self.titles[movie],
+            "year": self.years[movie],
+            "stars": {person_ids[star] for star in self.index.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.index.movie_ids)
+
+    def __len__(self):
+        return len(self.index.movie_ids)
+
+
+class NameTable(Mapping):
+    """
+    Read-only mapping of lower-cased names to a set of person_ids,
+    backed by a sorted column of names and the interned people of
+    every name in CSR form.
+    """
+
+    def __init__(self, index, keys, offsets, people):
+        self.index = index
+        self.keys = keys
+        self.offsets = offsets
+        self.people = people
+
+    def __getitem__(self, name):
+        i = bisect_left(self.keys, name)
+        if i == len(self.keys) or self.keys[i] != name:
+            raise KeyError(name)
+        person_ids = self.index.person_ids
+        return {person_ids[person] for person in
+                self.people[self.offsets[i]:self.offsets[i + 1]]}
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def name_columns(person_names):
+    """
+    Returns the columns a `NameTable` is built from, given the name of
+    every interned person: the sorted lower-cased names and the people
+    of every name in CSR form.
+    """
+    keys = [name.lower() for name in person_names]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+
+    name_keys = []
+    name_offsets = array("i", [0])
+    name_people = array("i")
+    for person in order:
+        if not name_keys or name_keys[-1] != keys[person]:
+            if name_keys:
+                name_offsets.append(len(name_people))
+            name_keys.append(keys[person])
+        name_people.append(person)
+    if name_keys:
+        name_offsets.append(len(name_people))
+
+    return {
+        "name_keys": name_keys,
+        "name_offsets": name_offsets,
+        "name_people": name_people
+    }
+
+
+def _trace(parents, person):
+    """
+    Follows parent links back to the root and returns the path
+    from the root to `person` as (movie, person) pairs.
+    """
+    path = []
+    while parents[person] is not None and parents[person][1] is not None:
+        movie, parent = parents[person][:2]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def _csr(num_rows, rows, columns):
+    """
+    Groups parallel arrays of (row, column) pairs by row.
+    Returns the row offsets and the sorted, distinct columns of every row.
+    """
+    # Count entries per row, then turn counts into offsets
+    offsets = array("i", [0]) * (num_rows + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for row in range(num_rows):
+        offsets[row + 1] += offsets[row]
+
+    # Scatter columns into their rows
+    values = array("i", [0]) * len(rows)
+    cursor = array("i", offsets)
+    for row, column in zip(rows, columns):
+        values[cursor[row]] = column
+        cursor[row] += 1
+
+    # Sort every row, dropping repeated pairs
+    distinct = array("i")
+    distinct_offsets = array("i", [0])
+    for row in range(num_rows):
+        distinct.extend(sorted(set(values[offsets[row]:offsets[row + 1]])))
+        distinct_offsets.append(len(distinct))
+    return distinct_offsets, distinct
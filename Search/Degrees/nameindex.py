@@ -0,0 +1,106 @@
+import difflib
+import math
+from array import array
+from bisect import bisect_left
+
+# Share of the similarity cutoff that the trigram overlap of a candidate
+# must reach before it is compared character by character
+OVERLAP = 0.75
+
+
+class NameIndex():
+    """
+    Index over lower-cased names answering prefix queries from a sorted
+    list and typo-tolerant queries from an index of character trigrams.
+    """
+
+    def __init__(self, keys):
+        """
+        Builds the index over an iterable of lower-cased names.
+        """
+        self.keys = sorted(set(keys))
+
+        # Maps each trigram to the positions of the names containing it
+        self.trigrams = {}
+        self.sizes = array("i")
+        for position, key in enumerate(self.keys):
+            key_trigrams = trigrams(key)
+            self.sizes.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                postings = self.trigrams.get(trigram)
+                if postings is None:
+                    postings = self.trigrams[trigram] = array("i")
+                postings.append(position)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with a prefix, in order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.keys, prefix)
+        while (i < len(self.keys) and len(matches) < limit
+                and self.keys[i].startswith(prefix)):
+            matches.append(self.keys[i])
+            i += 1
+        return matches
+
+    def fuzzy(self, name, limit=5, cutoff=0.6):
+        """
+        Returns up to `limit` (name, score) pairs for the names most
+        similar to `name`, best first, leaving out those scoring below
+        `cutoff` (1 is an exact match).
+        """
+        name = name.lower()
+        query = trigrams(name)
+        if not query:
+            return []
+
+        # Names sharing too few trigrams with the query cannot pass the
+        # cutoff, so only the rarest trigrams can bring in new candidates
+        postings = sorted(
+            (self.trigrams.get(trigram, array("i")) for trigram in query),
+            key=len
+        )
+        needed = max(1, math.ceil(cutoff * OVERLAP * (len(query) + 1) / 2))
+        admitting = len(postings) - needed + 1
+
+        # Count the trigrams each candidate shares with the query
+        shared = {}
+        for posting in postings[:admitting]:
+            for position in posting:
+                shared[position] = shared.get(position, 0) + 1
+        for posting in postings[admitting:]:
+            for position in shared:
+                i = bisect_left(posting, position)
+                if i < len(posting) and posting[i] == position:
+                    shared[position] += 1
+
+        # Keep the names whose trigram overlap alone could pass the cutoff
+        candidates = []
+        for position, count in shared.items():
+            overlap = 2 * count / (len(query) + self.sizes[position])
+            if overlap >= cutoff * OVERLAP:
+                candidates.append((overlap, self.keys[position]))
+        candidates.sort(reverse=True)
+
+        # Rank the best of them by edit similarity
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(name)
+        matches = []
+        for _, key in candidates[:limit * 10]:
+            matcher.set_seq1(key)
+            score = matcher.ratio()
+            if score >= cutoff:
+                matches.append((key, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+
+def trigrams(name):
+    """
+    Returns the set of character trigrams of a name, padded so that
+    the start and end of every word count as well.
+    """
+    padded = "  " + " ".join(name.split()) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
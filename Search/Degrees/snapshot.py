@@ -0,0 +1,247 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# Name of the snapshot file written next to the CSV files
+SNAPSHOT_NAME = "degrees.snapshot"
+
+# CSV files the snapshot is built from
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGSNAP"
+VERSION = 2
+
+# Magic, version, byte order, then size, mtime and sha256 of every source
+HEADER = struct.Struct("<7sBc" + "qq32s" * len(SOURCES))
+
+# String columns stored in the snapshot, in order
+STRING_COLUMNS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years", "name_keys"
+)
+
+# Integer columns of the graph index stored in the snapshot, in order
+ARRAY_COLUMNS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars"
+)
+
+# Integer columns of the name lookup table stored in the snapshot, in order
+NAME_COLUMNS = ("name_offsets", "name_people")
+
+
+def snapshot_path(directory):
+    """
+    Returns the path of the snapshot kept for a data directory.
+    """
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def write(directory, index, tables):
+    """
+    Writes a snapshot of the graph index and of the `tables` that go
+    with it for a data directory: the name, birth, title and year
+    columns aligned with the interned ids of the index, and the sorted
+    lower-cased names with the people of each name in CSR form.
+    """
+    columns = dict(tables)
+    columns["person_ids"] = index.person_ids
+    columns["movie_ids"] = index.movie_ids
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(_header(directory))
+            for name in STRING_COLUMNS:
+                _write_strings(f, columns[name])
+            for name in ARRAY_COLUMNS:
+                _write_array(f, getattr(index, name))
+            for name in NAME_COLUMNS:
+                _write_array(f, columns[name])
+
+        # Replace the old snapshot in one step so readers never see half
+        # a file
+        os.replace(temporary, path)
+    except BaseException:
+        # Leave no partial file behind
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def read(directory, index):
+    """
+    Loads the snapshot of a data directory into the graph index.
+    Returns the string tables stored with it, or None if there is no
+    snapshot or if it is older than the CSV files.
+    """
+    path = snapshot_path(directory)
+    try:
+        with open(path, "rb") as f:
+            if not _is_fresh(directory, f):
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    # Integer arrays are used straight from the mapped file; a truncated
+    # or corrupt body is treated like a missing snapshot
+    try:
+        view = memoryview(data)
+        offset = HEADER.size
+        columns = {}
+        for name in STRING_COLUMNS:
+            columns[name], offset = _read_strings(view, offset)
+        for name in ARRAY_COLUMNS + NAME_COLUMNS:
+            columns[name], offset = _read_array(view, offset)
+        if not _is_consistent(columns):
+            return None
+    except (OSError, ValueError, struct.error, UnicodeDecodeError,
+            TypeError):
+        return None
+
+    index.clear()
+    index.person_ids = columns.pop("person_ids")
+    index.movie_ids = columns.pop("movie_ids")
+    index.person_index = dict(
+        zip(index.person_ids, range(len(index.person_ids)))
+    )
+    index.movie_index = dict(zip(index.movie_ids, range(len(index.movie_ids))))
+    for name in ARRAY_COLUMNS:
+        setattr(index, name, columns.pop(name))
+    return columns
+
+
+def _is_consistent(columns):
+    """
+    Checks that the columns read from a snapshot have matching lengths.
+    """
+    people = len(columns["person_ids"])
+    movies = len(columns["movie_ids"])
+    return (
+        len(columns["person_names"]) == len(columns["person_births"])
+        == people
+        and len(columns["movie_titles"]) == len(columns["movie_years"])
+        == movies
+        and len(columns["person_offsets"]) == people + 1
+        and len(columns["movie_offsets"]) == movies + 1
+        and len(columns["name_offsets"]) == len(columns["name_keys"]) + 1
+        and columns["person_offsets"][-1] == len(columns["person_movies"])
+        and columns["movie_offsets"][-1] == len(columns["movie_stars"])
+        and columns["name_offsets"][-1] == len(columns["name_people"])
+    )
+
+
+def _is_fresh(directory, f):
+    """
+    Checks the header of an open snapshot against the CSV files.
+    A CSV whose mtime changed but whose contents did not is accepted,
+    and the new mtime is recorded in the header.
+    """
+    fields = HEADER.unpack(f.read(HEADER.size))
+    magic, version, byteorder = fields[:3]
+    if (magic != MAGIC or version != VERSION
+            or byteorder != sys.byteorder[:1].encode()):
+        return False
+
+    touched = False
+    for i, name in enumerate(SOURCES):
+        size, mtime, digest = fields[3 + 3 * i:6 + 3 * i]
+        stat = os.stat(os.path.join(directory, name))
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime_ns != mtime:
+            if _digest(os.path.join(directory, name)) != digest:
+                return False
+            touched = True
+
+    # Remember the new mtimes so the files are not hashed again next time
+    if touched:
+        try:
+            with open(f.name, "r+b") as header:
+                header.write(_header(directory))
+        except OSError:
+            pass
+    return True
+
+
+def _header(directory):
+    """
+    Returns the snapshot header describing the current CSV files.
+    """
+    fields = [MAGIC, VERSION, sys.byteorder[:1].encode()]
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        fields.extend((stat.st_size, stat.st_mtime_ns, _digest(path)))
+    return HEADER.pack(*fields)
+
+
+def _digest(path):
+    """
+    Returns the sha256 digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _write_array(f, values):
+    """
+    Writes an integer array as its length followed by its items,
+    padded to a multiple of 8 bytes.
+    """
+    data = array("i", values).tobytes()
+    f.write(struct.pack("<q", len(data)))
+    f.write(data)
+    f.write(b"\0" * (-len(data) % 8))
+
+
+def _read_array(view, offset):
+    """
+    Returns an integer array written by `_write_array` as a memoryview
+    over the snapshot, and the offset just after it.
+    """
+    (length,) = struct.unpack_from("<q", view, offset)
+    offset += 8
+    if length < 0 or offset + length > len(view):
+        raise ValueError("truncated snapshot")
+    values = view[offset:offset + length].cast("i")
+    return values, offset + length + (-length % 8)
+
+
+def _write_strings(f, strings):
+    """
+    Writes a list of strings as one NUL-separated UTF-8 blob.
+    """
+    if any("\0" in string for string in strings):
+        raise ValueError("strings must not contain NUL characters")
+    blob = "\0".join(strings).encode("utf-8")
+    f.write(struct.pack("<qq", len(strings), len(blob)))
+    f.write(blob)
+    f.write(b"\0" * (-len(blob) % 8))
+
+
+def _read_strings(view, offset):
+    """
+    Returns a list of strings written by `_write_strings`,
+    and the offset just after it.
+    """
+    count, length = struct.unpack_from("<qq", view, offset)
+    offset += 16
+    if length < 0 or offset + length > len(view):
+        raise ValueError("truncated snapshot")
+    if count:
+        strings = str(view[offset:offset + length], "utf-8").split("\0")
+    else:
+        strings = []
+    if len(strings) != count:
+        raise ValueError("corrupt snapshot")
+    return strings, offset + length + (-length % 8)
@@ -1,8 +1,14 @@
+import heapq
+import itertools
+from collections import deque
+
+
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
@@ -26,6 +32,9 @@ class StackFrontier():
             self.frontier = self.frontier[:-1]
             return node
 
+    def __len__(self):
+        return len(self.frontier)
+
 
 class QueueFrontier(StackFrontier):
 
@@ -36,3 +45,123 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque, with a count of the states
+    it holds so that membership checks take constant time.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self._forget(node.state)
+            return node
+
+    def _forget(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+    def __len__(self):
+        return len(self.frontier)
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self._forget(node.state)
+            return node
+
+
+class PriorityFrontier(DequeStackFrontier):
+    """
+    Frontier that always removes the node with the lowest
+    `node.cost + heuristic(node.state)`.
+    Without a heuristic it drives uniform-cost search, with an
+    admissible one it drives A* search. Ties are removed in
+    insertion order.
+    """
+    def __init__(self, heuristic=None):
+        super().__init__()
+        self.frontier = []
+        self.heuristic = heuristic
+        self.counter = itertools.count()
+
+    def add(self, node):
+        priority = node.cost
+        if self.heuristic is not None:
+            priority += self.heuristic(node.state)
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = heapq.heappop(self.frontier)[2]
+            self._forget(node.state)
+            return node
+
+
+class SearchStats():
+    """
+    Counters describing the work done by one or more searches.
+    """
+    def __init__(self):
+        self.searches = 0
+        self.explored = 0
+        self.peak_frontier = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.seconds = 0.0
+
+    def add(self, explored, peak_frontier, generated, duplicates):
+        """
+        Records the counters of one search.
+        `explored` counts expanded states, `generated` the neighbors
+        produced while expanding them and `duplicates` those among
+        them that were already reached.
+        """
+        self.searches += 1
+        self.explored += explored
+        self.peak_frontier = max(self.peak_frontier, peak_frontier)
+        self.generated += generated
+        self.duplicates += duplicates
+
+    def as_dict(self):
+        return {
+            "searches": self.searches,
+            "explored": self.explored,
+            "peak_frontier": self.peak_frontier,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "seconds": self.seconds
+        }
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={value}"
+                           for key, value in self.as_dict().items())
+        return f"SearchStats({fields})"
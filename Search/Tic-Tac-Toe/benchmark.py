@@ -0,0 +1,237 @@
+"""
+Headless benchmark of the Tic Tac Toe engines: plays full games without
+pygame and compares search speed, move latency and memory of each engine
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import tictactoe as ttt
+from mcts import MCTSPlayer
+from mnk import MNKGame
+
+# Engines to compare, as named on the command line
+ENGINES = ["minimax", "alphabeta", "book", "mnk", "mcts"]
+
+# Opening book loaded by tictactoe, set aside while other engines run
+BOOK = ttt.book
+
+
+def engine(name):
+    """
+    Returns a fresh move function of an engine, taking a board and a
+    stats dictionary and returning an action, with empty caches.
+    """
+    ttt.transposition_table.clear()
+    ttt.book = BOOK if name == "book" else None
+    if name == "book":
+        if BOOK is None:
+            sys.exit("No opening book, run book.py first.")
+        return ttt.minimax
+    if name == "minimax":
+        return ttt.minimax
+    if name == "alphabeta":
+        return ttt.alphabeta
+    if name == "mnk":
+        game = MNKGame(3, 3, 3)
+        return lambda board, stats: game.minimax(
+            game.from_board(board), depth=9, stats=stats
+        )
+    if name == "mcts":
+        game = MNKGame(3, 3, 3)
+        player = MCTSPlayer(game, playouts=1000, seed=0)
+        return lambda board, stats: player.move(
+            game.from_board(board), stats
+        )
+    raise ValueError(f"Unknown engine: {name}")
+
+
+def random_player(rng):
+    """
+    Returns a move function playing uniformly random moves.
+    """
+    return lambda board, stats: rng.choice(sorted(ttt.actions(board)))
+
+
+def play(player_x, player_o, measured, stats, latencies):
+    """
+    Plays one game and returns its winner (None for a tie).
+    The players in `measured` add their searched positions to `stats`
+    and the seconds of each move to `latencies`.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        move_function = player_x if ttt.player(board) == ttt.X else player_o
+        if move_function in measured:
+            start = time.perf_counter()
+            move = move_function(board, stats)
+            latencies.append(time.perf_counter() - start)
+        else:
+            move = move_function(board, None)
+        board = ttt.result(board, move)
+    return ttt.winner(board)
+
+
+def run(name, games, versus, seed):
+    """
+    Plays `games` games of an engine against itself or against random
+    moves, alternating sides. Returns a dictionary of measurements.
+    """
+    rng = random.Random(seed)
+    move_function = engine(name)
+    stats = {"nodes": 0}
+    latencies = []
+    results = {"wins": 0, "losses": 0, "ties": 0}
+    for game in range(games):
+        if versus == "self":
+            winner = play(move_function, move_function, {move_function},
+                          stats, latencies)
+            side = ttt.X
+        else:
+            opponent = random_player(rng)
+            side = ttt.X if game % 2 == 0 else ttt.O
+            if side == ttt.X:
+                players = (move_function, opponent)
+            else:
+                players = (opponent, move_function)
+            winner = play(*players, {move_function}, stats, latencies)
+        if winner is None:
+            results["ties"] += 1
+        elif winner == side:
+            results["wins"] += 1
+        else:
+            results["losses"] += 1
+
+    seconds = sum(latencies)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    else:
+        cuts = latencies * 99
+    return {
+        "engine": name,
+        "versus": versus,
+        "games": games,
+        "moves": len(latencies),
+        "nodes": stats["nodes"],
+        "positions_per_second": stats["nodes"] / seconds if seconds else 0,
+        "p50": cuts[49],
+        "p90": cuts[89],
+        "p99": cuts[98],
+        "max": max(latencies),
+        "peak_memory": peak_memory(name),
+        **results
+    }
+
+
+def peak_memory(name):
+    """
+    Returns the peak bytes allocated while an engine plays one game
+    against itself from empty caches. Measured apart from the timed
+    games, which tracing allocations would slow down.
+    """
+    tracemalloc.start()
+    try:
+        move_function = engine(name)
+        play(move_function, move_function, set(), None, [])
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check_opening():
+    """
+    Checks that the depth-4 and timed searches of the empty board with
+    radius pruning open in the center region, within the radius of the
+    center. Returns the failures as messages.
+    """
+    failures = []
+    for m, n, k, radius in [(15, 15, 5, 1), (15, 15, 5, 2), (9, 9, 5, 1)]:
+        game = MNKGame(m, n, k, radius)
+        state = game.initial_state()
+        moves = {
+            "minimax": game.minimax(state, depth=4),
+            "search": game.search(state, time_budget=1.0)
+        }
+        for method, (i, j) in moves.items():
+            if (abs(i - (m - 1) / 2) > radius
+                    or abs(j - (n - 1) / 2) > radius):
+                failures.append(f"{m},{n},{k} radius {radius}: {method} "
+                                f"opens at {(i, j)}")
+    return failures
+
+
+def print_table(rows):
+    """
+    Prints measurements as an aligned table, one engine per line.
+    """
+    header = ["engine", "versus", "games", "moves", "nodes", "pos/s",
+              "p50 ms", "p90 ms", "p99 ms", "max ms", "peak KiB",
+              "W/L/T"]
+    lines = [header]
+    for row in rows:
+        lines.append([
+            row["engine"],
+            row["versus"],
+            str(row["games"]),
+            str(row["moves"]),
+            str(row["nodes"]),
+            f"{row['positions_per_second']:.0f}",
+            f"{row['p50'] * 1000:.3f}",
+            f"{row['p90'] * 1000:.3f}",
+            f"{row['p99'] * 1000:.3f}",
+            f"{row['max'] * 1000:.3f}",
+            f"{row['peak_memory'] / 1024:.0f}",
+            f"{row['wins']}/{row['losses']}/{row['ties']}"
+        ])
+    widths = [max(len(line[i]) for line in lines)
+              for i in range(len(header))]
+    for line in lines:
+        print("  ".join(cell.rjust(width)
+                        for cell, width in zip(line, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Tic-Tac-Toe engines without the pygame window "
+                    "and compare their speed."
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=ENGINES, default=ENGINES,
+        help="engines to benchmark"
+    )
+    parser.add_argument(
+        "--games", type=int, default=100, help="games per engine and mode"
+    )
+    parser.add_argument(
+        "--versus", choices=["self", "random", "both"], default="both",
+        help="play against the engine itself, random moves, or both"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the random player"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only check that big-board openings are central"
+    )
+    args = parser.parse_args()
+    if args.check:
+        failures = check_opening()
+        for failure in failures:
+            print(failure)
+        sys.exit(1 if failures else 0)
+    modes = ["self", "random"] if args.versus == "both" else [args.versus]
+
+    rows = []
+    for name in args.engines:
+        for versus in modes:
+            rows.append(run(name, args.games, versus, args.seed))
+    ttt.book = BOOK
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
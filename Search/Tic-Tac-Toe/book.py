@@ -0,0 +1,52 @@
+"""
+Opening book for Tic Tac Toe: solves every reachable board with minimax
+and stores the move it plays there, one byte per board, in book.bin
+"""
+
+import sys
+
+import tictactoe as ttt
+
+
+def solve():
+    """
+    Returns the book as bytes: for every board number
+    TERN[x] + 2 * TERN[o], the cell minimax plays on that board,
+    or NO_MOVE for boards that are unreachable or over.
+    """
+    # Search every board instead of reading the current book
+    ttt.book = None
+
+    book = bytearray([ttt.NO_MOVE]) * ttt.BOOK_SIZE
+    seen = set()
+    frontier = [(0, 0)]
+    while frontier:
+        x, o = frontier.pop()
+        code = ttt.TERN[x] + 2 * ttt.TERN[o]
+        if code in seen:
+            continue
+        seen.add(code)
+        if ttt.bitboard_terminal(x, o):
+            continue
+
+        i, j = ttt.minimax(ttt.from_bitboard(x, o))
+        book[code] = 3 * i + j
+        for cell in ttt.bitboard_actions(x, o):
+            frontier.append(ttt.bitboard_result(x, o, cell))
+    return bytes(book)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_PATH
+
+    book = solve()
+    with open(path, "wb") as f:
+        f.write(book)
+    moves = sum(move != ttt.NO_MOVE for move in book)
+    print(f"Wrote {moves} moves ({len(book)} bytes) to {path}")
+
+
+if __name__ == "__main__":
+    main()
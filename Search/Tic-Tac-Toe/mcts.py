@@ -0,0 +1,186 @@
+"""
+Monte Carlo Tree Search player for m,n,k games (tic-tac-toe is 3,3,3)
+"""
+
+import math
+import random
+import time
+
+
+class TreeNode():
+    """
+    Position in the search tree, reached by `move` from its parent.
+    `wins` counts the playouts through it won by the player who made
+    that move, with ties counting as half a win.
+    """
+
+    __slots__ = ("x", "o", "move", "parent", "children", "untried",
+                 "visits", "wins", "mover", "winner")
+
+    def __init__(self, game, x, o, move, parent):
+        self.x = x
+        self.o = o
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+
+        # Player who made `move`: 0 for X, 1 for O
+        self.mover = 0 if x.bit_count() > o.bit_count() else 1
+
+        # 0 or 1 for the player who won here, 2 for a tie, None otherwise
+        self.winner = None
+        if move is not None:
+            bits = o if self.mover else x
+            if any(bits & mask == mask for mask in game.cell_windows[move]):
+                self.winner = self.mover
+            elif x | o == game.full:
+                self.winner = 2
+
+        taken = x | o
+        self.untried = [] if self.winner is not None else [
+            cell for cell in game.order if not taken >> cell & 1
+        ]
+
+
+class MCTSPlayer():
+    """
+    Plays an `mnk.MNKGame` by Monte Carlo Tree Search with the UCT rule:
+    every playout walks down the tree to the most promising move, adds
+    one new position and finishes the game with random moves.
+
+    Each move runs `playouts` playouts, or as many as fit in
+    `time_budget` seconds when that is set. Higher `c` explores more.
+    The subtree of the position reached is kept for the next move.
+    """
+
+    def __init__(self, game, playouts=1000, time_budget=None,
+                 c=math.sqrt(2), seed=None):
+        self.game = game
+        self.playouts = playouts
+        self.time_budget = time_budget
+        self.c = c
+        self.random = random.Random(seed)
+        self.root = None
+
+    def move(self, state, stats=None):
+        """
+        Returns the action (i, j) the player makes in a state.
+        If `stats` is given, the positions played through are added to
+        `stats["nodes"]` and the playouts to `stats["playouts"]`.
+        """
+        game = self.game
+        if game.terminal(state):
+            return None
+        root = self._reuse(state)
+
+        positions = playouts = 0
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+        while True:
+            if deadline is None:
+                if playouts >= self.playouts:
+                    break
+            elif playouts and time.perf_counter() >= deadline:
+                break
+            positions += self._playout(root)
+            playouts += 1
+
+        if stats is not None:
+            stats["nodes"] = stats.get("nodes", 0) + positions
+            stats["playouts"] = stats.get("playouts", 0) + playouts
+
+        # Play the most visited move and keep its subtree
+        best = max(root.children, key=lambda child: child.visits)
+        best.parent = None
+        self.root = best
+        return divmod(best.move, game.n)
+
+    def _reuse(self, state):
+        """
+        Returns the node of a state in the tree kept from the last move,
+        looking at the opponent's replies, or a new tree for the state.
+        """
+        x, o, _ = state
+        if self.root is not None:
+            for node in [self.root] + self.root.children:
+                if node.x == x and node.o == o:
+                    node.parent = None
+                    return node
+                for child in node.children:
+                    if child.x == x and child.o == o:
+                        child.parent = None
+                        return child
+        return TreeNode(self.game, x, o, None, None)
+
+    def _playout(self, root):
+        """
+        Runs one playout from the root and records its result in every
+        node on its path. Returns the number of positions played through.
+        """
+        c = self.c
+        node = root
+        positions = 1
+
+        # Selection: follow the best UCT score while all moves are tried
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(
+                node.children,
+                key=lambda child: child.wins / child.visits
+                + c * math.sqrt(log_visits / child.visits)
+            )
+            positions += 1
+
+        # Expansion: add one untried move
+        if node.untried:
+            untried = node.untried
+            cell = untried.pop(self.random.randrange(len(untried)))
+            bit = 1 << cell
+            if node.x.bit_count() <= node.o.bit_count():
+                child = TreeNode(self.game, node.x | bit, node.o, cell, node)
+            else:
+                child = TreeNode(self.game, node.x, node.o | bit, cell, node)
+            node.children.append(child)
+            node = child
+            positions += 1
+
+        # Simulation: random moves until the game ends
+        if node.winner is not None:
+            winner = node.winner
+        else:
+            winner, length = self._rollout(node.x, node.o, 1 - node.mover)
+            positions += length
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner == node.mover:
+                node.wins += 1
+            elif winner == 2:
+                node.wins += 0.5
+            node = node.parent
+        return positions
+
+    def _rollout(self, x, o, to_move):
+        """
+        Plays random moves from (x, o) bitboards, starting with
+        `to_move` (0 for X, 1 for O), until the game ends.
+        Returns the winner (2 for a tie) and the number of moves played.
+        """
+        cell_windows = self.game.cell_windows
+        taken = x | o
+        empty = [cell for cell in range(self.game.m * self.game.n)
+                 if not taken >> cell & 1]
+        self.random.shuffle(empty)
+        bits = [x, o]
+        for length, cell in enumerate(empty, 1):
+            mine = bits[to_move] | 1 << cell
+            bits[to_move] = mine
+            for mask in cell_windows[cell]:
+                if mine & mask == mask:
+                    return to_move, length
+            to_move ^= 1
+        return 2, len(empty)
@@ -0,0 +1,496 @@
+"""
+Generalized m,n,k game: an m x n board where k marks in a row win
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tictactoe import X, O, EMPTY
+
+# Score of a won position, larger than any heuristic evaluation
+WIN = 10 ** 9
+
+# Bounds stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Game searched by the current worker process of a parallel search
+worker_game = None
+
+# Position the worker's transposition table was filled from
+worker_root = None
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+
+
+class MNKGame():
+    """
+    Engine for an m x n board (m rows, n columns) where the first player
+    to get k marks in a row, column or diagonal wins.
+
+    A state is a tuple (x, o, last): bitboards of the X and O marks,
+    with cell (i, j) at bit i * n + j, and the cell of the last move
+    (None on the empty board). Wins are detected around the last move
+    only. Search is depth-limited alpha-beta with a heuristic evaluation.
+    When `radius` is set, the search only considers empty cells within
+    that many rows and columns of a mark of the position searched from
+    (of the center on the empty board) or of a move searched since.
+    """
+
+    def __init__(self, m=3, n=3, k=3, radius=None):
+        if not 0 < k <= max(m, n):
+            raise ValueError("k must fit on the board")
+        if radius is not None and radius < 1:
+            raise ValueError("radius must be at least 1")
+        self.m = m
+        self.n = n
+        self.k = k
+        self.radius = radius
+        self.full = (1 << (m * n)) - 1
+
+        # Every line of k cells, as a bitboard mask
+        self.windows = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        mask = 0
+                        for step in range(k):
+                            cell = (i + di * step) * n + j + dj * step
+                            mask |= 1 << cell
+                        self.windows.append(mask)
+
+        # Lines through each cell: the only ones a move there can complete
+        self.cell_windows = [
+            [mask for mask in self.windows if mask >> cell & 1]
+            for cell in range(m * n)
+        ]
+
+        # Cells close to each cell, used to restrict the moves searched
+        self.near = []
+        for cell in range(m * n):
+            i, j = divmod(cell, n)
+            mask = 0
+            if radius is not None:
+                rows = range(max(0, i - radius), min(m, i + radius + 1))
+                columns = range(max(0, j - radius), min(n, j + radius + 1))
+                for a in rows:
+                    for b in columns:
+                        mask |= 1 << (a * n + b)
+            self.near.append(mask)
+
+        # Cells ordered from the center outwards, to try central moves first
+        center_i, center_j = (m - 1) / 2, (n - 1) / 2
+        self.order = sorted(
+            range(m * n),
+            key=lambda cell: (abs(cell // n - center_i)
+                              + abs(cell % n - center_j))
+        )
+
+        # Heuristic weight of a line holding 0..k marks of a single player
+        self.weights = [0] + [10 ** count for count in range(k - 1)] + [WIN]
+
+        # Transposition table: (mine, theirs) -> (depth, bound, value, move),
+        # emptied at the start of every search
+        self.table = {}
+
+        # Process pool of parallel searches, started on first use
+        self.pool = None
+        self.workers = None
+
+        # perf_counter() time at which the running search gives up
+        self.deadline = None
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return (0, 0, None)
+
+    def player(self, state):
+        """
+        Returns player who has the next turn in a state.
+        """
+        x, o, _ = state
+        return X if x.bit_count() <= o.bit_count() else O
+
+    def actions(self, state):
+        """
+        Returns set of all possible actions (i, j) available in a state.
+        """
+        x, o, _ = state
+        taken = x | o
+        return {divmod(cell, self.n) for cell in range(self.m * self.n)
+                if not taken >> cell & 1}
+
+    def result(self, state, action):
+        """
+        Returns the state that results from making move (i, j) in a state.
+        """
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n):
+            raise Exception("Action not possible")
+        x, o, _ = state
+        cell = i * self.n + j
+        bit = 1 << cell
+        if (x | o) & bit or self.terminal(state):
+            raise Exception("Action not possible")
+        if x.bit_count() <= o.bit_count():
+            return (x | bit, o, cell)
+        return (x, o | bit, cell)
+
+    def winner(self, state):
+        """
+        Returns the winner of the game, if there is one,
+        checking only the lines through the last move.
+        """
+        x, o, last = state
+        if last is None:
+            return None
+        if x >> last & 1:
+            return X if self._completes(x, last) else None
+        return O if self._completes(o, last) else None
+
+    def terminal(self, state):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        x, o, _ = state
+        return x | o == self.full or self.winner(state) is not None
+
+    def utility(self, state):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        win = self.winner(state)
+        if win is X:
+            return 1
+        elif win is O:
+            return -1
+        return 0
+
+    def evaluate(self, state):
+        """
+        Returns a heuristic score of a state for X: every line still open
+        to only one player counts for that player, more the fuller it is.
+        """
+        x, o, _ = state
+        if self.winner(state) is not None:
+            return WIN * self.utility(state)
+        return self._score(x, o)
+
+    def minimax(self, state, depth=4, stats=None, workers=1):
+        """
+        Returns the best action (i, j) for the current player, searching
+        `depth` moves ahead and scoring the positions there with
+        `evaluate`. If `stats` is given, the number of searched
+        positions is added to `stats["nodes"]`.
+
+        With more than one worker, the moves after the first are searched
+        in parallel by a pool of processes (see `close`), which returns
+        the same action as searching them one by one.
+        """
+        if self.terminal(state):
+            return None
+        mine, theirs, last = self._relative(state)
+        allowed = self._neighbourhood(mine | theirs)
+        self.table.clear()
+        if workers > 1:
+            best_move = self._parallel_root(mine, theirs, allowed, depth,
+                                            stats, workers)[1]
+        else:
+            best_move = self._root(mine, theirs, last, allowed, depth,
+                                   -math.inf, math.inf, stats)[1]
+        return divmod(best_move, self.n)
+
+    def search(self, state, time_budget=1.0, max_depth=None, stats=None):
+        """
+        Returns the best action (i, j) for the current player found in
+        about `time_budget` seconds, searching 1, 2, 3... moves ahead
+        and keeping the move of the deepest search that completed.
+        Each search tries the best move of the previous one first.
+        If `stats` is given, the number of searched positions is added
+        to `stats["nodes"]` and the depth reached is `stats["depth"]`.
+        """
+        if self.terminal(state):
+            return None
+        mine, theirs, last = self._relative(state)
+        empty = (self.full & ~(mine | theirs)).bit_count()
+        if max_depth is None or max_depth > empty:
+            max_depth = empty
+
+        allowed = self._neighbourhood(mine | theirs)
+        self.table.clear()
+
+        # Move played if not even the first search completes
+        best_move = self._moves(mine, theirs, allowed)[0]
+
+        self.deadline = time.perf_counter() + time_budget
+        try:
+            for depth in range(1, max_depth + 1):
+                value, best_move = self._root(mine, theirs, last, allowed,
+                                              depth, -math.inf, math.inf,
+                                              stats, best_move)
+                if stats is not None:
+                    stats["depth"] = depth
+
+                # A forced win or loss stays one at every deeper search
+                if abs(value) >= WIN:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return divmod(best_move, self.n)
+
+    def close(self):
+        """
+        Shuts down the worker processes of parallel searches.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.workers = None
+
+    def from_board(self, board):
+        """
+        Returns the state of a list-of-lists board.
+        The last move is unknown, so wins are checked everywhere.
+        """
+        x = o = 0
+        for i in range(self.m):
+            for j in range(self.n):
+                if board[i][j] == X:
+                    x |= 1 << (i * self.n + j)
+                elif board[i][j] == O:
+                    o |= 1 << (i * self.n + j)
+        for mask in self.windows:
+            for bits in (x, o):
+                if bits & mask == mask:
+                    return (x, o, (mask & -mask).bit_length() - 1)
+        return (x, o, None)
+
+    def to_board(self, state):
+        """
+        Returns the list-of-lists board of a state.
+        """
+        x, o, _ = state
+        board = [[EMPTY] * self.n for _ in range(self.m)]
+        for cell in range(self.m * self.n):
+            i, j = divmod(cell, self.n)
+            if x >> cell & 1:
+                board[i][j] = X
+            elif o >> cell & 1:
+                board[i][j] = O
+        return board
+
+    def _relative(self, state):
+        """
+        Returns a state as (marks of the player to move, marks of the
+        other player, last move), the form the search works on.
+        """
+        x, o, last = state
+        if x.bit_count() <= o.bit_count():
+            return x, o, last
+        return o, x, last
+
+    def _completes(self, bits, cell):
+        """
+        Checks whether the marks in `bits` fill a line through a cell.
+        """
+        for mask in self.cell_windows[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def _score(self, mine, theirs):
+        """
+        Heuristic value of the position for the owner of `mine`.
+        """
+        weights = self.weights
+        score = 0
+        for mask in self.windows:
+            if not mask & theirs:
+                score += weights[(mask & mine).bit_count()]
+            elif not mask & mine:
+                score -= weights[(mask & theirs).bit_count()]
+        return score
+
+    def _neighbourhood(self, taken):
+        """
+        Returns the cells a search from a position with the marks in
+        `taken` may play: those near a mark, or near the center on the
+        empty board, or every cell when `radius` is not set.
+        """
+        if self.radius is None:
+            return self.full
+        if not taken:
+            return self.near[self.order[0]]
+        allowed = 0
+        while taken:
+            low = taken & -taken
+            allowed |= self.near[low.bit_length() - 1]
+            taken ^= low
+        return allowed
+
+    def _moves(self, mine, theirs, allowed, first=None):
+        """
+        Returns the empty cells of `allowed` to search, the most
+        promising first: the given move, then moves that win at once,
+        then moves that stop an immediate win of the other player, then
+        the rest from the center outwards.
+        """
+        allowed &= ~(mine | theirs)
+        moves = [cell for cell in self.order if allowed >> cell & 1]
+        urgent = [cell for cell in moves
+                  if self._completes(mine | 1 << cell, cell)]
+        urgent += [cell for cell in moves if cell not in urgent
+                   and self._completes(theirs | 1 << cell, cell)]
+        if first is not None and first in moves and first not in urgent:
+            urgent.insert(0, first)
+        return urgent + [cell for cell in moves if cell not in urgent]
+
+    def _root(self, mine, theirs, last, allowed, depth, alpha, beta,
+              stats, first=None):
+        """
+        Searches the moves of the root position in order.
+        Returns (value, best cell), keeping the first best move found.
+        """
+        best = (-math.inf, None)
+        for cell in self._moves(mine, theirs, allowed, first):
+            value = -self._negamax(theirs, mine | 1 << cell, cell,
+                                   allowed | self.near[cell], depth - 1,
+                                   -beta, -alpha, stats)
+            if value > best[0]:
+                best = (value, cell)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best
+
+    def _parallel_root(self, mine, theirs, allowed, depth, stats, workers,
+                       first=None):
+        """
+        Searches the first move of the root position here, then every
+        other move in the worker processes with the value of the first
+        as their lower bound. Returns (value, best cell), keeping the
+        first best move in order like `_root`.
+        """
+        moves = self._moves(mine, theirs, allowed, first)
+        value = -self._negamax(theirs, mine | 1 << moves[0], moves[0],
+                               allowed | self.near[moves[0]], depth - 1,
+                               -math.inf, math.inf, stats)
+        best = (value, moves[0])
+        if len(moves) == 1:
+            return best
+
+        if self.pool is None or self.workers != workers:
+            self.close()
+            self.pool = ProcessPoolExecutor(
+                workers, initializer=_start_worker,
+                initargs=(self.m, self.n, self.k, self.radius)
+            )
+            self.workers = workers
+
+        # Moves no better than the first fail low and lose to it; those
+        # that are better get their exact value, so the first of the
+        # best moves wins just as in the serial search
+        futures = [
+            self.pool.submit(_search_move, mine, theirs, allowed, cell,
+                             depth, value)
+            for cell in moves[1:]
+        ]
+        for cell, future in zip(moves[1:], futures):
+            score, nodes = future.result()
+            if stats is not None:
+                stats["nodes"] += nodes
+            if score > best[0]:
+                best = (score, cell)
+        return best
+
+    def _negamax(self, mine, theirs, last, allowed, depth, alpha, beta,
+                 stats):
+        """
+        Returns the value of a position for the player to move, who owns
+        `mine`, searching `depth` moves ahead with alpha-beta pruning
+        among the cells of `allowed`.
+        """
+        if stats is not None:
+            stats["nodes"] += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        # The other player just moved: did that win the game
+        if last is not None and self._completes(theirs, last):
+            return -(WIN + depth)
+        if mine | theirs == self.full:
+            return 0
+        if depth <= 0:
+            return self._score(mine, theirs)
+
+        # Reuse what an earlier search learned about this position
+        key = (mine, theirs)
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            stored_depth, bound, stored_value, first = entry
+
+            # Values of other depths would make the result depend on
+            # what was searched before, so only the move is reused then
+            if stored_depth == depth:
+                if bound == EXACT:
+                    return stored_value
+                if bound == LOWER and stored_value >= beta:
+                    return stored_value
+                if bound == UPPER and stored_value <= alpha:
+                    return stored_value
+
+        original_alpha = alpha
+        value, best = -math.inf, None
+        for cell in self._moves(mine, theirs, allowed, first):
+            score = -self._negamax(theirs, mine | 1 << cell, cell,
+                                   allowed | self.near[cell], depth - 1,
+                                   -beta, -alpha, stats)
+            if score > value:
+                value, best = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if value <= original_alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[key] = (depth, bound, value, best)
+        return value
+
+
+def _start_worker(m, n, k, radius):
+    """
+    Pool initializer: creates the game the worker process searches.
+    """
+    global worker_game
+    worker_game = MNKGame(m, n, k, radius)
+
+
+def _search_move(mine, theirs, allowed, cell, depth, alpha):
+    """
+    Pool entry point: returns the value of a root move for the player
+    who owns `mine`, when it beats `alpha`, and the positions searched.
+    """
+    global worker_root
+    if worker_root != (mine, theirs):
+        worker_game.table.clear()
+        worker_root = (mine, theirs)
+    stats = {"nodes": 0}
+    value = -worker_game._negamax(theirs, mine | 1 << cell, cell,
+                                  allowed | worker_game.near[cell],
+                                  depth - 1, -math.inf, -alpha, stats)
+    return value, stats["nodes"]
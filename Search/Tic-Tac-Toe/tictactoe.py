@@ -3,12 +3,101 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+import os
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Every cell (i, j) of the board; cell (i, j) is bit 3 * i + j of a bitboard
+CELLS = [(i, j) for i in range(3) for j in range(3)]
+
+# Bitboard with every cell set
+FULL = 0b111111111
+
+# The 8 lines that win the game: 3 rows, 3 columns and 2 diagonals
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100]
+
+# For every bitboard of one player: does it contain a whole line
+WINNING = [any(bits & mask == mask for mask in WIN_MASKS)
+           for bits in range(FULL + 1)]
+
+# For every bitboard of one player: how many marks it holds
+MARKS = [bin(bits).count("1") for bits in range(FULL + 1)]
+
+# The 8 symmetries of the board (rotations and reflections), each given as
+# the cell (i, j) whose mark lands on every cell of the transformed board
+SYMMETRIES = [
+    [(i, j) for i in range(3) for j in range(3)],
+    [(2 - j, i) for i in range(3) for j in range(3)],
+    [(2 - i, 2 - j) for i in range(3) for j in range(3)],
+    [(j, 2 - i) for i in range(3) for j in range(3)],
+    [(i, 2 - j) for i in range(3) for j in range(3)],
+    [(2 - i, j) for i in range(3) for j in range(3)],
+    [(j, i) for i in range(3) for j in range(3)],
+    [(2 - j, 2 - i) for i in range(3) for j in range(3)]
+]
+
+
+def _symmetry_table(symmetry):
+    """
+    Returns the image of every bitboard under a symmetry.
+    """
+    table = []
+    for bits in range(FULL + 1):
+        image = 0
+        for cell, (i, j) in enumerate(symmetry):
+            if bits >> (3 * i + j) & 1:
+                image |= 1 << cell
+        table.append(image)
+    return table
+
+
+SYMMETRY_TABLES = [_symmetry_table(symmetry) for symmetry in SYMMETRIES]
+
+# Transposition table: canonical board key -> minimax value of the board
+transposition_table = {}
+
+# Order in which alpha-beta tries cells: center, corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+MOVE_ORDER_BITS = [3 * i + j for i, j in MOVE_ORDER]
+
+# For every bitboard of one player: its marks as a base-3 number with one
+# digit per cell, so that TERN[x] + 2 * TERN[o] numbers every board
+TERN = [sum(3 ** cell for cell in range(9) if bits >> cell & 1)
+        for bits in range(FULL + 1)]
+
+# Opening book written by book.py: one byte per board number holding the
+# cell minimax plays there, or NO_MOVE
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.bin")
+BOOK_SIZE = 3 ** 9
+NO_MOVE = 255
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Returns the opening book stored at a path,
+    or None if there is no valid book there.
+    """
+    try:
+        with open(path, "rb") as f:
+            book = f.read()
+    except OSError:
+        return None
+    if len(book) != BOOK_SIZE:
+        return None
+    return book
+
+
+book = load_book()
+
+# m,n,k engine searching 3x3 boards for `anytime`, created on first use
+anytime_game = None
+
 
 def initial_state():
     """
@@ -23,176 +112,227 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    # Initialize X and O counters
-    x_counter = 0
-    o_counter =0
-
-    # Loops through board
-    for row in board:
-        for field in row:
-            if field == X:
-                x_counter += 1
-            elif field == O:
-                o_counter += 1
-    
-    # Decide which turn it is
-    if x_counter > o_counter:
-        return O
-    elif x_counter < o_counter:
-        return X
-    else:
-        return X
+    return bitboard_player(*to_bitboard(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    possible_actions = set()
-
-    # Loops through board
-    for row in range(3):
-        for field in range(3):
-            if board[row][field] == EMPTY:
-                possible_actions.add((row, field))
-
-    return possible_actions
-
+    return {CELLS[cell] for cell in bitboard_actions(*to_bitboard(board))}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    # Deep copy state of the board
-    new_board_state = copy.deepcopy(board)
-
-    # Sign that will be played by player
-    sign = player(board)
+    x, o = to_bitboard(board)
 
     # Check if action is possible
     if action not in actions(board):
         raise Exception("Action not possible")
-    
-    # Update board with new state
-    new_board_state[action[0]][action[1]] = sign
 
-    return new_board_state
+    return from_bitboard(*bitboard_result(x, o, 3 * action[0] + action[1]))
+
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # Check which player is expected to win
-    expected_sign = None
-    if player(board) is X:
-        expected_sign = O
-    else:
-        expected_sign = X
-
-    # Check if 3 in a row vertically
-    for i in range(3):
-        vertical_counter = 0
-        for j in range(3):
-            if board[j][i] is expected_sign:
-                vertical_counter += 1
-        if vertical_counter == 3:
-            return expected_sign
-
-    # Check if 3 in a row horizontally
-    for i in range(3):
-        horizontal_counter = 0
-        for j in range (3):
-            if board[i][j] is expected_sign:
-                horizontal_counter += 1
-        if horizontal_counter == 3:
-            return expected_sign
- 
-    # Check if 3 in a row left diagonally
-    l_diagonal_counter = 0
-    for i in range(3):
-        if board[i][i] is expected_sign:
-            l_diagonal_counter += 1
-        if l_diagonal_counter == 3:
-            return expected_sign
-
-    # Check if 3 in a row right diagonally
-    r_diagonal_counter = 0
-    for i in range(3):
-        if board[i][2-i] is expected_sign:
-            r_diagonal_counter += 1
-        if r_diagonal_counter == 3:
-            return expected_sign
+    return bitboard_winner(*to_bitboard(board))
 
-    return None
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    # If someone won the game
-    if winner(board) is not None:
-        return True
+    return bitboard_terminal(*to_bitboard(board))
 
-    # Check if it is an uncomplete game
-    for row in board:
-        for field in row:
-            if field is EMPTY:
-                return False
-            
-    # If there is no EMPTY game is over
-    return True
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    win = winner(board)
-    if win is X:
+    return bitboard_utility(*to_bitboard(board))
+
+
+# Bitboard representation: X and O marks as two 9-bit integers
+def to_bitboard(board):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board.
+    """
+    x = o = 0
+    for cell, (i, j) in enumerate(CELLS):
+        if board[i][j] == X:
+            x |= 1 << cell
+        elif board[i][j] == O:
+            o |= 1 << cell
+    return x, o
+
+
+def from_bitboard(x, o):
+    """
+    Returns the list-of-lists board of (x, o) bitboards.
+    """
+    board = initial_state()
+    for cell, (i, j) in enumerate(CELLS):
+        if x >> cell & 1:
+            board[i][j] = X
+        elif o >> cell & 1:
+            board[i][j] = O
+    return board
+
+
+def bitboard_player(x, o):
+    """
+    Returns player who has the next turn on (x, o) bitboards.
+    """
+    return X if MARKS[x] <= MARKS[o] else O
+
+
+def bitboard_actions(x, o):
+    """
+    Returns the empty cells (bit indices) of (x, o) bitboards.
+    """
+    taken = x | o
+    return [cell for cell in range(9) if not taken >> cell & 1]
+
+
+def bitboard_result(x, o, cell):
+    """
+    Returns the (x, o) bitboards after the current player marks a cell.
+    """
+    bit = 1 << cell
+    if (x | o) & bit:
+        raise Exception("Action not possible")
+    if MARKS[x] <= MARKS[o]:
+        return x | bit, o
+    return x, o | bit
+
+
+def bitboard_winner(x, o):
+    """
+    Returns the winner on (x, o) bitboards, if there is one.
+    """
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def bitboard_terminal(x, o):
+    """
+    Returns True if the game on (x, o) bitboards is over.
+    """
+    return WINNING[x] or WINNING[o] or x | o == FULL
+
+
+def bitboard_utility(x, o):
+    """
+    Returns 1 if X has won on (x, o) bitboards, -1 if O has, 0 otherwise.
+    """
+    if WINNING[x]:
         return 1
-    elif win is O:
+    if WINNING[o]:
         return -1
-    else:
-        return 0
+    return 0
 
-# Functions for minimax algorythm
-def max_value(board):
-    value = -math.inf
 
-    if terminal(board):
-        return utility(board)
-    
-    for action in actions(board):
-        value = max(value, min_value(result(board, action)))
+def bitboard_key(x, o):
+    """
+    Returns a key for (x, o) bitboards that is shared by all their
+    rotations and reflections.
+    """
+    return min(table[x] << 9 | table[o] for table in SYMMETRY_TABLES)
 
-    return value
 
-def min_value(board):
-    value = math.inf
+def book_move(x, o):
+    """
+    Returns the cell the opening book plays on (x, o) bitboards,
+    or None if there is no book or no move.
+    """
+    if book is None:
+        return None
+    move = book[TERN[x] + 2 * TERN[o]]
+    return None if move == NO_MOVE else move
 
-    if terminal(board):
-        return utility(board)
-    
-    for action in actions(board):
-        value = min(value, max_value(result(board, action)))
 
+def board_key(board):
+    """
+    Returns a key for the board that is shared by all its
+    rotations and reflections.
+    """
+    return bitboard_key(*to_bitboard(board))
+
+
+# Functions for minimax algorythm
+def bitboard_value(x, o, stats=None):
+    """
+    Returns the minimax value of (x, o) bitboards.
+    """
+    if stats is not None:
+        stats["nodes"] += 1
+
+    # Reuse the value of this position or of a symmetric one
+    key = bitboard_key(x, o)
+    if key in transposition_table:
+        return transposition_table[key]
+
+    if WINNING[x]:
+        value = 1
+    elif WINNING[o]:
+        value = -1
+    elif x | o == FULL:
+        value = 0
+    elif MARKS[x] <= MARKS[o]:
+        value = -math.inf
+        for cell in bitboard_actions(x, o):
+            value = max(value, bitboard_value(x | 1 << cell, o, stats))
+    else:
+        value = math.inf
+        for cell in bitboard_actions(x, o):
+            value = min(value, bitboard_value(x, o | 1 << cell, stats))
+
+    transposition_table[key] = value
     return value
 
-def minimax(board):
+
+def max_value(board, stats=None):
+    return bitboard_value(*to_bitboard(board), stats)
+
+
+def min_value(board, stats=None):
+    return bitboard_value(*to_bitboard(board), stats)
+
+
+def minimax(board, stats=None, time_budget=None):
     """
     Returns the optimal action for the current player on the board.
+    If `stats` is given, the number of searched positions is added
+    to `stats["nodes"]`.
+    With a `time_budget` in seconds and no opening book, the action
+    comes from `anytime` instead and is optimal only if time allows.
     """
     # If board is terminal board
     if terminal(board):
         return None
-    
+
+    # Answer from the opening book without searching, if there is one
+    move = book_move(*to_bitboard(board))
+    if move is not None:
+        return CELLS[move]
+
+    if time_budget is not None:
+        return anytime(board, time_budget, stats)
+
     if player(board) is X:
         best_value = -math.inf
         best_action = None
         for action in actions(board):
 
             # Check how selected action ends up game score
-            value = min_value(result(board, action))
+            value = min_value(result(board, action), stats)
 
             # Immediately make winner move for Max-player
             if value == 1:
@@ -203,26 +343,128 @@ def minimax(board):
                 best_value = value
                 best_action = action
 
-        # Return best option      
+        # Return best option
         return best_action
-    
+
     else:
         best_value = math.inf
         best_action = None
         for action in actions(board):
-            
+
             # Check how selected action ends up game score
-            value = max_value(result(board, action))
+            value = max_value(result(board, action), stats)
 
             # Immediately make winner move for Min-player
             if value == -1:
                 return action
-            
+
             # Choose best option for Min-player
             if value < best_value:
                 best_value = value
                 best_action = action
 
-        # Return best option      
+        # Return best option
         return best_action
 
+
+def anytime(board, time_budget, stats=None):
+    """
+    Returns the best action for the current player found in about
+    `time_budget` seconds by iterative deepening (see mnk.py).
+    """
+    global anytime_game
+    if anytime_game is None:
+        from mnk import MNKGame
+        anytime_game = MNKGame(3, 3, 3)
+    state = anytime_game.from_board(board)
+    return anytime_game.search(state, time_budget, stats=stats)
+
+
+def ordered_cells(x, o):
+    """
+    Returns the empty cells of (x, o) bitboards, best candidates first:
+    moves that win immediately, then the center, corners and edges.
+    """
+    taken = x | o
+    mine = x if MARKS[x] <= MARKS[o] else o
+    moves = [cell for cell in MOVE_ORDER_BITS if not taken >> cell & 1]
+    winning = [cell for cell in moves if WINNING[mine | 1 << cell]]
+    return winning + [cell for cell in moves if cell not in winning]
+
+
+def ordered_actions(board):
+    """
+    Returns the possible actions on the board, best candidates first:
+    moves that win immediately, then the center, corners and edges.
+    """
+    return [CELLS[cell] for cell in ordered_cells(*to_bitboard(board))]
+
+
+def bitboard_alphabeta(x, o, alpha, beta, stats=None):
+    """
+    Returns the minimax value of (x, o) bitboards, searching with
+    alpha-beta pruning. The value is exact when it lies strictly between
+    alpha and beta, otherwise it is only a bound on the same side.
+    """
+    if stats is not None:
+        stats["nodes"] += 1
+
+    if bitboard_terminal(x, o):
+        return bitboard_utility(x, o)
+
+    if MARKS[x] <= MARKS[o]:
+        value = -math.inf
+        for cell in ordered_cells(x, o):
+            value = max(value, bitboard_alphabeta(
+                x | 1 << cell, o, alpha, beta, stats
+            ))
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+    else:
+        value = math.inf
+        for cell in ordered_cells(x, o):
+            value = min(value, bitboard_alphabeta(
+                x, o | 1 << cell, alpha, beta, stats
+            ))
+            if value <= alpha:
+                return value
+            beta = min(beta, value)
+    return value
+
+
+def alphabeta_value(board, alpha, beta, stats=None):
+    """
+    Returns the minimax value of the board, searching with alpha-beta
+    pruning. The value is exact when it lies strictly between alpha and
+    beta, otherwise it is only a bound on the same side of the window.
+    """
+    return bitboard_alphabeta(*to_bitboard(board), alpha, beta, stats)
+
+
+def alphabeta(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching with alpha-beta pruning and move ordering.
+    The action is the same one `minimax` returns. If `stats` is given,
+    the number of searched positions is added to `stats["nodes"]`.
+    """
+    # If board is terminal board
+    if terminal(board):
+        return None
+
+    # Value of the board when both players play optimally
+    best_value = alphabeta_value(board, -math.inf, math.inf, stats)
+
+    # Like minimax, pick the first action in `actions` order that keeps
+    # the best value, testing each one with a window just around it
+    for action in actions(board):
+        child = result(board, action)
+        if player(board) is X:
+            if alphabeta_value(child, best_value - 0.5, best_value,
+                               stats) >= best_value:
+                return action
+        else:
+            if alphabeta_value(child, best_value, best_value + 0.5,
+                               stats) <= best_value:
+                return action